@@ -2,6 +2,7 @@ from surface_code_routing import utils
 from surface_code_routing import symbol
 from surface_code_routing import scope 
 from surface_code_routing import bind 
+from surface_code_routing import instruction_template
 from surface_code_routing import instructions
 from surface_code_routing import dag
 from surface_code_routing import qcb 
@@ -9,7 +10,13 @@ from surface_code_routing import allocator
 from surface_code_routing import qcb_graph
 from surface_code_routing import qcb_tree
 from surface_code_routing import tree_slots
+from surface_code_routing import placement
 from surface_code_routing import mapper 
+from surface_code_routing import timeline
+from surface_code_routing import priority
+from surface_code_routing import ready_queue
+from surface_code_routing import cost_model
+from surface_code_routing import compact_dag
 from surface_code_routing import router
 from surface_code_routing import compiled_qcb
 from surface_code_routing import lib_instructions
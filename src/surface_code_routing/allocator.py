@@ -5,6 +5,68 @@
 from surface_code_routing.qcb import Segment, SCPatch, QCB
 import surface_code_routing.utils as utils
 from surface_code_routing.bind import AddrBind
+from surface_code_routing.constants import EXCEEDED_CYCLE_BUDGET
+
+import multiprocessing
+
+def scoring_worker(dag, extern_templates, compile_kwargs, tasks, results):
+    '''
+        Worker for scoring allocator configurations
+        The DAG and extern templates are inherited when the worker is forked, compiled externs cannot be pickled
+        Each task names its externs by their template index, configurations that exceed the budget score None
+        Exceptions are returned in place of the score
+    '''
+    for index, n_channels, templates, cycle_budget in iter(tasks.get, None):
+        try:
+            externs = [extern_templates[template].instantiate() for template in templates]
+            score = dag.compile(n_channels, *externs, cycle_budget=cycle_budget, **compile_kwargs)[0]
+        except Exception as err:
+            results.put((index, err))
+            continue
+        results.put((index, None if score is EXCEEDED_CYCLE_BUDGET else score))
+
+class ScoringPool:
+    '''
+        Forked worker processes that score allocator configurations
+        Workers are forked once and reused for each scoring call
+    '''
+    def __init__(self, n_processes, dag, extern_templates, compile_kwargs):
+        context = multiprocessing.get_context('fork')
+        self.tasks = context.SimpleQueue()
+        self.results = context.SimpleQueue()
+        self.workers = [
+            context.Process(target=scoring_worker, args=(dag, extern_templates, compile_kwargs, self.tasks, self.results), daemon=True)
+            for _ in range(n_processes)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def score(self, configurations, cycle_budget=None):
+        '''
+            Scores (n_channels, template indices) configurations
+            Configurations that exceed the cycle budget score EXCEEDED_CYCLE_BUDGET
+        '''
+        for index, (n_channels, templates) in enumerate(configurations):
+            self.tasks.put((index, n_channels, templates, cycle_budget))
+
+        scores = [None] * len(configurations)
+        for _ in configurations:
+            index, score = self.results.get()
+            scores[index] = EXCEEDED_CYCLE_BUDGET if score is None else score
+
+        for score in scores:
+            if isinstance(score, Exception):
+                raise score
+        return scores
+
+    def close(self):
+        '''
+            Stops the workers
+        '''
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
 
 class AllocatorError(Exception):
     '''
@@ -41,7 +103,9 @@ class Allocator:
         verbose=False,  # Verbose debugging info
         opt_space=False,  # Space optimisation (not currently used)
         opt_route=True,  # Route optimisation (not currently used)
-        over_allocate=False # Early termination of optimisation
+        over_allocate=False, # Early termination of optimisation
+        compile_kwargs=None, # Arguments passed to DAG.compile
+        n_processes=None # Worker processes for scoring optimisation candidates
         ):
         '''
             :: qcb : QCB :: QCB object to allocate to
@@ -50,6 +114,8 @@ class Allocator:
             :: tikz_build : bool :: Incremental tikz building 
             :: verbose : bool :: Debug info
             :: over_allocate : bool :: Terminate optimisation only on space constraints  
+            :: compile_kwargs : dict :: Keyword arguments for each call to DAG.compile
+            :: n_processes : int :: Score optimisation candidates on a process pool, None scores serially
 
             over_allocate is a useful setting for `faster' circuits where there's a chance 
             of missing an extern speedup    
@@ -67,6 +133,22 @@ class Allocator:
 
         self.over_allocate = over_allocate
 
+        if compile_kwargs is None:
+            compile_kwargs = dict()
+        self.compile_kwargs = compile_kwargs
+
+        # Scores of previously compiled channel and extern configurations
+        self.compile_cache = dict()
+        self.compile_cache_hits = 0
+        self.compile_cache_misses = 0
+        # Configurations that are known to exceed a cycle budget
+        self.compile_bounds = dict()
+
+        # Scores evaluated by the process pool that have not yet been requested
+        self.n_processes = n_processes
+        self.pool = None
+        self.pool_scores = dict()
+
         if opt_space and opt_route:
             raise AllocatorError("Cannot optimise for both space and routes, these are mutually exclusive")
         self.opt_space = opt_space # Try to optimise space at the cost of routes
@@ -172,10 +254,19 @@ class Allocator:
         # Attempts to allocate either an extern or a new channel
         dag = self.qcb.operations
         self.debug_print("Attempting to optimise remaining space\n")
-        while self.optimise_invariant() is True:
-            self.build_tikz_str()
-            self.global_merge_tl()
-            self.debug_print('\n')
+
+        # Scoring workers are forked once for the optimisation pass
+        if self.n_processes is not None and 'fork' in multiprocessing.get_all_start_methods():
+            self.pool = ScoringPool(self.n_processes, dag, self.extern_templates, self.compile_kwargs)
+        try:
+            while self.optimise_invariant() is True:
+                self.build_tikz_str()
+                self.global_merge_tl()
+                self.debug_print('\n')
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool = None
 
         self.debug_print("Allocating Additional Channels")
         # Splits remaining blocks
@@ -187,7 +278,7 @@ class Allocator:
             pass
 
         # Set final compilation in the DAG 
-        n_layers, compiled_layers = dag.compile(self.n_channels, *self.externs)
+        n_layers, compiled_layers = dag.compile(self.n_channels, *self.externs, **self.compile_kwargs)
         #self.qcb.compiled_layers = compiled_layers
 
         self.global_top_merge()
@@ -315,6 +406,88 @@ class Allocator:
         return
 
 
+    def compile_score(self, n_channels, *externs, cycle_budget=None) -> int:
+        '''
+            Number of cycles to execute the DAG with a given channel and extern configuration
+            Scores are cached on the number of channels and the multiset of extern symbols and cycle counts
+            If a cycle budget is given, configurations that exceed it return EXCEEDED_CYCLE_BUDGET
+        '''
+        key = self.compile_key(n_channels, *externs)
+        score = self.compile_cache.get(key)
+        if score is not None:
+            self.compile_cache_hits += 1
+            if cycle_budget is not None and score > cycle_budget:
+                return EXCEEDED_CYCLE_BUDGET
+            return score
+
+        # Known to exceed a budget at least this large
+        if cycle_budget is not None and self.compile_bounds.get(key, -1) >= cycle_budget:
+            self.compile_cache_hits += 1
+            return EXCEEDED_CYCLE_BUDGET
+
+        self.compile_cache_misses += 1
+        score = self.pool_scores.pop(key, None)
+        if score is None:
+            score = self.qcb.operations.compile(n_channels, *externs, cycle_budget=cycle_budget, **self.compile_kwargs)[0]
+
+        if score is EXCEEDED_CYCLE_BUDGET:
+            self.compile_bounds[key] = cycle_budget
+            return score
+
+        self.compile_bounds.pop(key, None)
+        self.compile_cache[key] = score
+        if cycle_budget is not None and score > cycle_budget:
+            return EXCEEDED_CYCLE_BUDGET
+        return score
+
+    def compile_key(self, n_channels, *externs) -> tuple:
+        '''
+            Cache key for a channel and extern configuration
+        '''
+        return (n_channels, tuple(sorted(map(self.extern_key, externs))))
+
+    def extern_key(self, extern) -> tuple:
+        '''
+            Cache key for an extern
+        '''
+        return (repr(extern.get_symbol()), extern.n_cycles())
+
+    def pool_score(self, configurations, cycle_budget=None):
+        '''
+            Scores uncached (n_channels, externs) configurations on the process pool
+            Workers instantiate externs from the templates they inherited when they were forked
+            Configurations that exceed the cycle budget are recorded as bounds
+        '''
+        if self.pool is None:
+            return
+
+        templates = {self.extern_key(extern): index for index, extern in enumerate(self.extern_templates)}
+
+        pending = dict()
+        for n_channels, externs in configurations:
+            key = self.compile_key(n_channels, *externs)
+            if key in self.compile_cache or key in pending:
+                continue
+            if cycle_budget is not None and self.compile_bounds.get(key, -1) >= cycle_budget:
+                continue
+            pending[key] = (n_channels, tuple(templates[self.extern_key(extern)] for extern in externs))
+
+        # Not worth dispatching a single configuration
+        if len(pending) < 2:
+            return
+
+        for key, score in zip(pending.keys(), self.pool.score(list(pending.values()), cycle_budget=cycle_budget)):
+            if score is EXCEEDED_CYCLE_BUDGET:
+                self.compile_bounds[key] = cycle_budget
+            else:
+                self.pool_scores[key] = score
+
+    def compile_cache_stats(self) -> tuple:
+        '''
+            Hit and miss counts for the compile score cache
+        '''
+        return self.compile_cache_hits, self.compile_cache_misses
+
     def optimise_invariant(self) -> bool:
         '''
             Attempt an optimisation
@@ -323,30 +496,49 @@ class Allocator:
         if not self.get_free_segments():
             return False
 
-        def heuristic(new_extern):
+        def configuration(new_extern):
             '''
                 Tests addding a route vs adding one of any extern
             '''
             if new_extern:
-                return (new_extern, dag.compile(self.n_channels, *self.externs, new_extern)[0])
+                return (self.n_channels, (*self.externs, new_extern))
             else:
-                return (new_extern, dag.compile(self.n_channels + 1, *self.externs)[0])
+                return (self.n_channels + 1, tuple(self.externs))
 
         options = [new_extern.instantiate() for new_extern in self.extern_templates]
         options.append(None)
-        options = sorted(map(heuristic, options), key=lambda opt:opt[1])
-        self.debug_print(options)
-        curr_score = dag.compile(self.n_channels, *self.externs)[0]
+        configurations = list(map(configuration, options))
+
+        curr_score = self.compile_score(self.n_channels, *self.externs)
 
         # Compare options
         if self.over_allocate:
-            options = [opt[0] for opt in options if opt[1] <= curr_score]
+            cycle_budget = curr_score
         else:
-            options = [opt[0] for opt in options if opt[1] < curr_score]
-
-        # Attempt to perform a placement based on the options
-        for new_extern in options:
+            cycle_budget = curr_score - 1
+        candidates = list(zip(options, configurations))
+
+        # Candidates are independent and may be scored concurrently, each only until it exceeds the current score
+        self.pool_score(configurations, cycle_budget=cycle_budget)
+
+        # Attempt placements from the best scoring option
+        # Each option is only simulated until it is worse than the best seen so far
+        while len(candidates) > 0:
+            best_score = cycle_budget
+            best_idx = None
+            for idx, (new_extern, (n_channels, externs)) in enumerate(candidates):
+                score = self.compile_score(n_channels, *externs, cycle_budget=best_score)
+                if score is EXCEEDED_CYCLE_BUDGET:
+                    continue
+                if best_idx is None or score < best_score:
+                    best_score = score
+                    best_idx = idx
+
+            if best_idx is None:
+                return False
 
+            new_extern, _ = candidates.pop(best_idx)
+            self.debug_print(new_extern, best_score, curr_score)
 
             if not new_extern and self.allocate_channel():
                 self.n_channels += 1
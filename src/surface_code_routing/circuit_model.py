@@ -4,6 +4,8 @@
 """
 
 import queue
+from collections import OrderedDict
+from heapq import heappush, heappop
 import numpy as np
 
 from surface_code_routing.qcb import SCPatch
@@ -12,6 +14,7 @@ from surface_code_routing.utils import debug_print
 from surface_code_routing.bind import AddrBind
 
 from surface_code_routing.constants import SINGLE_ANCILLAE, ELBOW_ANCILLAE
+from surface_code_routing.cost_model import patch_weights
 
 
 class PatchGraphNode:
@@ -26,6 +29,7 @@ class PatchGraphNode:
     SUGGEST_ROTATE = AddrBind("Suggest Rotate")
     ANCILLAE_STATES = {SCPatch.ROUTE, SCPatch.LOCAL_ROUTE}
     SCOPE_STATES = {SCPatch.REG, SCPatch.IO}
+    ORIENTATIONS = (X_ORIENTED, Z_ORIENTED)
 
 
     def __init__(
@@ -44,6 +48,32 @@ class PatchGraphNode:
 
         self.verbose = verbose
 
+    # Lock state, orientation and last use are held on the graph's arrays
+    @property
+    def lock_state(self):
+        return self.graph.lock_holders[self.y, self.x]
+
+    @lock_state.setter
+    def lock_state(self, lock):
+        self.graph.lock_holders[self.y, self.x] = lock
+        self.graph.lock_owners[self.y, self.x] = self.graph.lock_id(lock)
+
+    @property
+    def orientation(self) -> AddrBind:
+        return self.ORIENTATIONS[self.graph.orientations[self.y, self.x]]
+
+    @orientation.setter
+    def orientation(self, orientation):
+        self.graph.orientations[self.y, self.x] = self.ORIENTATIONS.index(orientation)
+
+    @property
+    def last_used(self) -> int:
+        return int(self.graph.free_at_cycle[self.y, self.x])
+
+    @last_used.setter
+    def last_used(self, cycle):
+        self.graph.free_at_cycle[self.y, self.x] = cycle
+
     def set_underlying(self, state):
         """
         Sets the underlying state of the patch
@@ -127,9 +157,9 @@ class PatchGraphNode:
 
     def cost(self):
         """
-        Currently unused
+        Cost of routing through this patch, raised on congested patches during negotiated routing
         """
-        return 1
+        return self.graph.patch_cost(self.y, self.x)
 
     def active_gates(self) -> set:
         """
@@ -147,20 +177,15 @@ class PatchGraphNode:
         """
         Probes whether this patch is locked or may be locked by the given gate
         """
-        if not unique and self.lock_state is lock_request:
-            return True
-        if unique and self.lock_state is lock_request:
-            return False
-        # Gate has completed and is no longer active
-        if self.lock_state not in self.active_gates():
-            return True
-        return False
+        return self.graph.probe(self.y, self.x, lock_request, unique=unique)
 
     def lock(self, dag_node):
         """
         Locks the patch for use by a dag node
         """
         if probe := self.probe(dag_node):
+            if self.state in self.ANCILLAE_STATES and self.lock_state is not dag_node:
+                self.graph.transfer_lock(self.lock_state, dag_node)
             self.lock_state = dag_node
         return probe
 
@@ -196,6 +221,20 @@ class PatchGraphNode:
             self.orientation = self.Z_ORIENTED
 
 
+class RouteToken:
+    """
+    Flat patch index held on the routing frontier
+    Ties on the frontier are broken as for PatchGraphNode, which always compares greater
+    """
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __lt__(self, other) -> bool:
+        return True
+
+
 class PatchGraph:
     """
     Graph of patches
@@ -204,6 +243,13 @@ class PatchGraph:
     VOLUME_PROBE = object()
     NO_PATH_FOUND = object()
 
+    # Patch state codes
+    STATE_ROUTE = 0
+    STATE_LOCAL_ROUTE = 1
+    STATE_REG = 2
+    STATE_IO = 3
+    STATE_OTHER = 4
+
     def __init__(
         self,
         shape: tuple,
@@ -211,7 +257,17 @@ class PatchGraph:
         environment,
         default_orientation=PatchGraphNode.X_ORIENTED,
         verbose: bool = False,
+        volume_check: bool = False,
+        fast_routing: bool = False,
+        route_cache_size: int = 0,
+        congestion_weight: float = 0,
     ):
+        """
+        :: volume_check : bool :: Assert the running space time volume against a full scan of the graph
+        :: fast_routing : bool :: Route using flat patch indices and preallocated search arrays
+        :: route_cache_size : int :: Number of routes to memoise on their endpoints and orientations, zero disables the cache
+        :: congestion_weight : float :: Additional cost of the routing channels with the most demand from the DAG's proximity and congestion statistics, zero disables weighting
+        """
         self.shape = shape
         self.environment = environment
         self.mapper = mapper
@@ -219,6 +275,22 @@ class PatchGraph:
 
         self.verbose = verbose
 
+        # Array representation of the patches
+        # Locks are held as integer ids, id 0 is the initial lock state
+        # Lock ids compare as the set of active gates does, holders retain the locking object
+        self.lock_ids = {PatchGraphNode.INITIAL_LOCK_STATE: 0}
+        self.lock_active = np.zeros(64, dtype=bool)
+        self.lock_owners = np.zeros(shape, dtype=np.int64)
+        self.lock_holders = np.full(shape, PatchGraphNode.INITIAL_LOCK_STATE, dtype=object)
+        self.orientations = np.zeros(shape, dtype=np.int8)
+        self.free_at_cycle = np.full(shape, -1, dtype=np.int64)
+
+        # Reservations of future cycles, lock id of the reserving gate and the cycle on which its reservation starts
+        self.reserved_by = np.full(shape, -1, dtype=np.int64)
+        self.reserved_from = np.zeros(shape, dtype=np.int64)
+        self.n_reservations = 0
+        self.current_cycle = 0
+
         self.graph = np.array(
             [
                 [
@@ -264,20 +336,167 @@ class PatchGraph:
                     uncleared_patches.append(local_patch)
             local_patches = uncleared_patches
 
+        # Patch states do not change after this point
+        self.state_codes = np.array(
+            [[self.state_code(patch.state) for patch in row] for row in self.graph],
+            dtype=np.int8,
+        ).reshape(shape)
+        self.ancillae_mask = (self.state_codes == self.STATE_ROUTE) | (self.state_codes == self.STATE_LOCAL_ROUTE)
+        self.scope_mask = (self.state_codes == self.STATE_REG) | (self.state_codes == self.STATE_IO)
+
+        # Running space time volume
+        # Scope patches are always in use, ancillae are counted against the gate that locked them
+        self.volume_check = volume_check
+        self.static_volume = int(np.count_nonzero(self.scope_mask))
+        self.lock_counts = dict()
+        self.active_volume = 0
+
+        # Routing tables are built on the first fast route
+        self.fast_routing = fast_routing
+        self.route_nodes = None
+
+        # Search statistics
+        self.n_routes = 0
+        self.route_expansions = 0
+
+        # Least recently used routes, reused while all of their patches are free and no route is shorter
+        self.route_cache_size = route_cache_size
+        self.route_cache = OrderedDict()
+        self.route_cache_hits = 0
+        self.route_cache_misses = 0
+
+        # Negotiated congestion, number of planned routes through each patch and the accumulated history cost
+        self.congestion = False
+        self.congestion_factor = 0
+        self.route_usage = np.zeros(shape, dtype=np.int64)
+        self.route_history = np.zeros(shape, dtype=np.float64)
+
+        # Static routing weights of each patch
+        self.weighted = congestion_weight > 0
+        if self.weighted:
+            self.patch_weights = patch_weights(self, mapper.dag, mapper, scale=congestion_weight)
+        else:
+            self.patch_weights = np.ones(shape)
+
     def space_time_volume(self) -> int: 
         '''
             Counts the number of in-use patches
         '''
-        volume = 0
-        for row in self.graph: 
-            for patch in row:
-                if patch.state in PatchGraphNode.ANCILLAE_STATES:
-                    if not patch.probe(PatchGraph.VOLUME_PROBE):
-                        volume += 1
-                elif patch.state in PatchGraphNode.SCOPE_STATES:
-                    volume += 1
+        volume = self.static_volume + self.active_volume
+        if self.volume_check:
+            assert volume == self.scan_space_time_volume()
         return volume
 
+    def scan_space_time_volume(self) -> int:
+        '''
+            Counts the number of in-use patches by scanning the graph
+        '''
+        locked = self.lock_active[self.lock_owners]
+        return int(np.count_nonzero(self.scope_mask) + np.count_nonzero(self.ancillae_mask & locked))
+
+    @staticmethod
+    def state_code(state) -> int:
+        '''
+            Integer code of a patch state
+        '''
+        if state is SCPatch.ROUTE:
+            return PatchGraph.STATE_ROUTE
+        if state is SCPatch.LOCAL_ROUTE:
+            return PatchGraph.STATE_LOCAL_ROUTE
+        if state is SCPatch.REG:
+            return PatchGraph.STATE_REG
+        if state is SCPatch.IO:
+            return PatchGraph.STATE_IO
+        return PatchGraph.STATE_OTHER
+
+    def lock_id(self, lock) -> int:
+        '''
+            Integer id of a lock holder
+        '''
+        index = self.lock_ids.get(lock)
+        if index is None:
+            index = len(self.lock_ids)
+            self.lock_ids[lock] = index
+            if index >= len(self.lock_active):
+                self.lock_active = np.concatenate((self.lock_active, np.zeros(len(self.lock_active), dtype=bool)))
+        return index
+
+    def probe(self, i, j, lock_request, unique=False) -> bool:
+        '''
+            Probes whether a patch is locked or may be locked by the given gate
+        '''
+        if self.lock_holders[i, j] is lock_request:
+            return not unique
+        if self.n_reservations > 0 and self.reserved(i, j, lock_request):
+            return False
+        # Gate has completed and is no longer active
+        return not self.lock_active[self.lock_owners[i, j]]
+
+    def free_mask(self, lock_request, unique=False) -> np.ndarray:
+        '''
+            Probes every patch, returns a boolean array of the patches that may be locked by the gate
+            Patches held by the gate are matched on lock id
+        '''
+        free = ~self.lock_active[self.lock_owners]
+        if self.n_reservations > 0:
+            free &= ~self.reservation_mask(lock_request)
+        owner = self.lock_ids.get(lock_request)
+        if owner is None:
+            return free
+        if unique:
+            return free & (self.lock_owners != owner)
+        return free | (self.lock_owners == owner)
+
+    def reserved(self, i, j, lock_request) -> bool:
+        '''
+            Checks if a patch is reserved by another gate for a cycle before the requesting gate would complete
+        '''
+        owner = self.reserved_by[i, j]
+        if owner < 0 or owner == self.lock_ids.get(lock_request):
+            return False
+        return self.current_cycle + self.lock_duration(lock_request) > self.reserved_from[i, j]
+
+    def reservation_mask(self, lock_request) -> np.ndarray:
+        '''
+            Patches reserved by other gates for a cycle before the requesting gate would complete
+        '''
+        owner = self.lock_ids.get(lock_request, -1)
+        return (
+            (self.reserved_by >= 0)
+            & (self.reserved_by != owner)
+            & (self.reserved_from < self.current_cycle + self.lock_duration(lock_request))
+        )
+
+    @staticmethod
+    def lock_duration(lock_request) -> int:
+        '''
+            Number of cycles for which a gate would hold its locks
+        '''
+        if not hasattr(lock_request, 'n_cycles'):
+            return 1
+        return max(lock_request.n_cycles(), 1)
+
+    def reserve(self, path, gate, cycle):
+        '''
+            Reserves the routing patches of a path for a gate from a future cycle
+        '''
+        owner = self.lock_id(gate)
+        for node in path:
+            if self.state_codes[node.y, node.x] == self.STATE_ROUTE:
+                self.reserved_by[node.y, node.x] = owner
+                self.reserved_from[node.y, node.x] = cycle
+        self.n_reservations = int(np.count_nonzero(self.reserved_by >= 0))
+
+    def release_reservation(self, gate):
+        '''
+            Releases all patches reserved by a gate
+        '''
+        owner = self.lock_ids.get(gate)
+        if owner is None:
+            return
+        self.reserved_by[self.reserved_by == owner] = -1
+        self.n_reservations = int(np.count_nonzero(self.reserved_by >= 0))
+
 
     def debug_print(self, *args, **kwargs):
         """
@@ -294,6 +513,34 @@ class PatchGraph:
         """
         return self.environment.active_gates
 
+    def transfer_lock(self, prev_lock, lock):
+        """
+        Moves an ancillae patch between lock holders
+        """
+        if prev_lock in self.lock_counts:
+            self.lock_counts[prev_lock] -= 1
+            if self.lock_active[self.lock_id(prev_lock)]:
+                self.active_volume -= 1
+        self.lock_counts[lock] = self.lock_counts.get(lock, 0) + 1
+        if self.lock_active[self.lock_id(lock)]:
+            self.active_volume += 1
+
+    def activate(self, gate):
+        """
+        Patches held by a newly active gate are now in use 
+        """
+        index = self.lock_id(gate)
+        self.lock_active[index] = True
+        self.active_volume += self.lock_counts.get(gate, 0)
+
+    def deactivate(self, gate):
+        """
+        Patches held by a resolved gate are no longer in use
+        """
+        index = self.lock_id(gate)
+        self.lock_active[index] = False
+        self.active_volume -= self.lock_counts.get(gate, 0)
+
     def adjacent(
         self,
         i,
@@ -350,10 +597,10 @@ class PatchGraph:
         """
             Force unlock all routes
         """
-        for grp in self.graph:
-            for node in grp:
-                if node.state in PatchGraphNode.ANCILLAE_STATES:
-                    node.lock_state = PatchGraphNode.INITIAL_LOCK_STATE
+        self.lock_owners[self.ancillae_mask] = 0
+        self.lock_holders[self.ancillae_mask] = PatchGraphNode.INITIAL_LOCK_STATE
+        self.lock_counts = dict()
+        self.active_volume = 0
 
     def route(
         self,
@@ -369,8 +616,112 @@ class PatchGraph:
         route
         Attempts to route from start to end using a given gate as a resource lock
         """
+        self.n_routes += 1
+        if self.route_cache_size == 0 or heuristic is not None or self.congestion:
+            return self.search_route(start, end, gate, heuristic=heuristic, track_rotations=track_rotations, start_orientation=start_orientation, end_orientation=end_orientation)
+
+        # Cached routes are held with the cost of the shortest route when no patches are locked
+        # A route found around a lock is not reused once that lock is released
+        key = (start.y, start.x, end.y, end.x, track_rotations, start_orientation, end_orientation)
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            path, shortest_cost = cached
+            if self.path_cost(path) <= shortest_cost and self.route_free(path, gate, track_rotations=track_rotations, start_orientation=start_orientation):
+                self.route_cache.move_to_end(key)
+                self.route_cache_hits += 1
+                return list(path)
+        self.route_cache_misses += 1
+
+        path = self.search_route(start, end, gate, track_rotations=track_rotations, start_orientation=start_orientation, end_orientation=end_orientation)
+        if path is not self.NO_PATH_FOUND:
+            if cached is None:
+                shortest_cost = self.unobstructed_route_cost(start, end, gate, track_rotations=track_rotations, start_orientation=start_orientation)
+            self.route_cache[key] = (list(path), shortest_cost)
+            self.route_cache.move_to_end(key)
+            if len(self.route_cache) > self.route_cache_size:
+                self.route_cache.popitem(last=False)
+        return path
+
+    def route_free(self, path, gate, track_rotations=True, start_orientation=None) -> bool:
+        """
+        Checks if a previously found route may still be locked by the gate
+        """
+        start = path[0]
+        orientation = start_orientation if track_rotations else None
+        if len(path) > 1 and path[1] not in start.adjacent(gate, orientation=orientation):
+            return False
+        return all(node.probe(gate) for node in path[1:])
+
+    def path_cost(self, path) -> float:
+        """
+        Cost of a route, each patch after the start costs its weight
+        """
+        if not self.weighted:
+            return len(path) - 1
+        return sum(self.patch_weights[node.y, node.x] for node in path[1:])
 
+    def unobstructed_route_cost(self, start, end, gate, track_rotations=True, start_orientation=None) -> float:
+        """
+        Cost of the cheapest route from start to end if no patches were locked
+        """
+        if self.route_nodes is None:
+            self.build_route_tables()
+
+        width = self.shape[1]
+        is_route = self.route_is_route
+        adjacency = self.route_adjacency
+        costs = self.patch_weights.ravel().tolist() if self.weighted else None
+
+        start_index = start.y * width + start.x
+        end_index = end.y * width + end.x
+
+        orientation = start_orientation if track_rotations else None
+        start_neighbours = [node.y * width + node.x for node in start.adjacent(gate, orientation=orientation, probe=False)]
+
+        path_cost = {start_index: 0}
+        frontier = [(0, start_index)]
+        while frontier:
+            cost, current = heappop(frontier)
+            if current == end_index:
+                return cost
+            if cost > path_cost[current]:
+                continue
+
+            neighbours = start_neighbours if current == start_index else adjacency[current]
+            for neighbour in neighbours:
+                if (neighbour == end_index and current != start_index) or is_route[neighbour]:
+                    neighbour_cost = cost + (1 if costs is None else costs[neighbour])
+                    if neighbour_cost < path_cost.get(neighbour, float('inf')):
+                        path_cost[neighbour] = neighbour_cost
+                        heappush(frontier, (neighbour_cost, neighbour))
+        return float('inf')
+
+    def route_cache_stats(self) -> tuple:
+        """
+        Hit and miss counts for the route cache
+        """
+        return self.route_cache_hits, self.route_cache_misses
+
+    def search_route(
+        self,
+        start,
+        end,
+        gate,
+        heuristic=None,
+        track_rotations=True,
+        start_orientation=None,
+        end_orientation=None,
+    ):
+        """
+        Searches for a route from start to end using a given gate as a resource lock
+        Without a heuristic, fast_routing searches with the weighted or negotiated patch costs if any, otherwise this A* search reads them
+        """
         if heuristic is None:
+            if self.congestion or self.weighted:
+                if self.fast_routing:
+                    return self.fast_route(start, end, gate, track_rotations=track_rotations, start_orientation=start_orientation, costs=self.patch_costs())
+            elif self.fast_routing:
+                return self.fast_route(start, end, gate, track_rotations=track_rotations, start_orientation=start_orientation)
             heuristic = self.heuristic
 
         frontier = queue.PriorityQueue()
@@ -384,6 +735,7 @@ class PatchGraph:
         orientation = None
         while not frontier.empty():
             current = frontier.get()[1]
+            self.route_expansions += 1
             if current == end:
                 break
 
@@ -426,6 +778,221 @@ class PatchGraph:
         final_route = traverse(path, end)[::-1] + [end]
         return final_route
 
+    def build_route_tables(self):
+        """
+        Flattens the graph for fast routing
+        Patches are indexed as y * width + x, patch states do not change after construction
+        """
+        width = self.shape[1]
+        self.route_nodes = list(self.graph.flat)
+        self.route_tokens = [RouteToken(index) for index in range(len(self.route_nodes))]
+        self.route_is_route = (self.state_codes == self.STATE_ROUTE).ravel().tolist()
+
+        # Unlocked adjacency of each patch, in the order given by adjacent
+        self.route_adjacency = [
+            [node.y * width + node.x for node in self.adjacent(patch.y, patch.x, None, probe=False)]
+            for patch in self.route_nodes
+        ]
+
+        # Search state, entries are only valid if their stamp matches the current search
+        self.route_cost = [0] * len(self.route_nodes)
+        self.route_parent = [-1] * len(self.route_nodes)
+        self.route_stamp = [0] * len(self.route_nodes)
+        self.route_search = 0
+
+    def fast_route(
+        self,
+        start,
+        end,
+        gate,
+        track_rotations=True,
+        start_orientation=None,
+        costs=None,
+    ):
+        """
+        A* over flat patch indices using heapq
+        Expands patches in the same order as route and returns the same path
+        :: costs : list :: Cost of each flat patch index, by default each patch costs 1
+        """
+        if self.route_nodes is None:
+            self.build_route_tables()
+
+        width = self.shape[1]
+        nodes = self.route_nodes
+        tokens = self.route_tokens
+        is_route = self.route_is_route
+        adjacency = self.route_adjacency
+        path_cost = self.route_cost
+        parent = self.route_parent
+        stamp = self.route_stamp
+        free = self.free_mask(gate).ravel()
+
+        self.route_search += 1
+        search = self.route_search
+
+        start_index = start.y * width + start.x
+        end_index = end.y * width + end.x
+        end_x, end_y = end.x, end.y
+        bias = 1 + 1e-7
+
+        stamp[start_index] = search
+        path_cost[start_index] = 0
+        parent[start_index] = -1
+
+        n_expansions = 0
+        frontier = [(0, tokens[start_index])]
+        while frontier:
+            current = heappop(frontier)[1].index
+            n_expansions += 1
+            if current == end_index:
+                break
+
+            if current == start_index:
+                # Correct join at the start
+                orientation = start_orientation if track_rotations else None
+                neighbours = [
+                    node.y * width + node.x for node in start.adjacent(gate, orientation=orientation)
+                ]
+            else:
+                neighbours = [neighbour for neighbour in adjacency[current] if free[neighbour]]
+
+            for neighbour in neighbours:
+                if (neighbour == end_index and current != start_index) or is_route[neighbour]:
+                    cost = path_cost[current] + (1 if costs is None else costs[neighbour])
+                    if stamp[neighbour] != search or cost < path_cost[neighbour]:
+                        stamp[neighbour] = search
+                        path_cost[neighbour] = cost
+                        parent[neighbour] = current
+                        x, y = neighbour % width, neighbour // width
+                        heappush(frontier, (cost + (abs(x - end_x) + bias * abs(y - end_y)), tokens[neighbour]))
+        else:
+            self.route_expansions += n_expansions
+            return self.NO_PATH_FOUND
+        self.route_expansions += n_expansions
+
+        final_route = []
+        current = end_index
+        while current != -1:
+            final_route.append(nodes[current])
+            current = parent[current]
+        return final_route[::-1]
+
+    def reservation_route(
+        self,
+        start,
+        end,
+        gate,
+        track_rotations=True,
+        start_orientation=None,
+    ):
+        """
+        Time expanded search for the earliest cycle from which a route may be held by the gate
+        Patches held by active gates become available on the cycle recorded in last_used
+        The start cycle of a route is the latest cycle on which any of its patches become available
+        Routes are ordered on their start cycle and then on their length
+        Returns the start cycle and the route
+        """
+        if self.route_nodes is None:
+            self.build_route_tables()
+
+        width = self.shape[1]
+        nodes = self.route_nodes
+        is_route = self.route_is_route
+        adjacency = self.route_adjacency
+        cycle = self.current_cycle
+
+        free = self.free_mask(gate).ravel()
+        available = np.where(free, cycle, np.maximum(self.free_at_cycle.ravel(), cycle + 1)).tolist()
+
+        # Patches reserved by other gates may not be reserved again
+        owner = self.lock_ids.get(gate, -1)
+        blocked = ((self.reserved_by >= 0) & (self.reserved_by != owner)).ravel().tolist()
+
+        start_index = start.y * width + start.x
+        end_index = end.y * width + end.x
+
+        # Correct join at the start, locks are accounted for by the availability of each patch
+        orientation = start_orientation if track_rotations else None
+        start_neighbours = [node.y * width + node.x for node in start.adjacent(gate, orientation=orientation, probe=False)]
+
+        labels = {start_index: (cycle, 0)}
+        parent = {start_index: -1}
+        frontier = [(cycle, 0, start_index)]
+        n_expansions = 0
+        while frontier:
+            start_cycle, length, current = heappop(frontier)
+            if labels[current] != (start_cycle, length):
+                continue
+            n_expansions += 1
+            if current == end_index:
+                break
+
+            neighbours = start_neighbours if current == start_index else adjacency[current]
+            for neighbour in neighbours:
+                if blocked[neighbour]:
+                    continue
+                if (neighbour == end_index and current != start_index) or is_route[neighbour]:
+                    label = (max(start_cycle, available[neighbour]), length + 1)
+                    if neighbour not in labels or label < labels[neighbour]:
+                        labels[neighbour] = label
+                        parent[neighbour] = current
+                        heappush(frontier, (*label, neighbour))
+        else:
+            self.route_expansions += n_expansions
+            return self.NO_PATH_FOUND
+        self.route_expansions += n_expansions
+
+        final_route = []
+        current = end_index
+        while current != -1:
+            final_route.append(nodes[current])
+            current = parent[current]
+        return labels[end_index][0], final_route[::-1]
+
+    def patch_cost(self, i, j):
+        """
+        Cost of routing through a patch
+        """
+        if not self.congestion:
+            if not self.weighted:
+                return 1
+            return self.patch_weights[i, j]
+        return self.patch_weights[i, j] * (1 + self.route_history[i, j]) * (1 + self.congestion_factor * self.route_usage[i, j])
+
+    def patch_costs(self) -> list:
+        """
+        Cost of routing through each flat patch index
+        """
+        return (self.patch_weights * (1 + self.route_history) * (1 + self.congestion_factor * self.route_usage)).ravel().tolist()
+
+    def occupy(self, path, n_routes=1):
+        """
+        Adds or removes a planned route from the usage count of its patches
+        """
+        for node in path:
+            self.route_usage[node.y, node.x] += n_routes
+
+    def contested(self) -> np.ndarray:
+        """
+        Routing patches claimed by more than one planned route
+        """
+        return (self.route_usage > 1) & (self.state_codes == self.STATE_ROUTE)
+
+    def clear_congestion(self):
+        """
+        Discards planned routes and history costs
+        """
+        self.congestion = False
+        self.congestion_factor = 0
+        self.route_usage[:] = 0
+        self.route_history[:] = 0
+
+    def route_stats(self):
+        """
+        Number of routes and the number of patches expanded over all searches
+        """
+        return self.n_routes, self.route_expansions
+
     def ancillae(self, gate, start, n_ancillae):
         """
         ancillae
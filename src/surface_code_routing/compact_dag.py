@@ -0,0 +1,241 @@
+'''
+    Compact DAG
+    Array backed adjacency and edges for large DAGs
+'''
+from collections.abc import MutableSet, MutableMapping
+from itertools import chain
+from bisect import bisect_left
+import numpy as np
+
+def gate_position(gates, gate):
+    '''
+        Position of a gate in the gates registered for compaction, None if it is not registered
+    '''
+    position = getattr(gate, 'compact_index', None)
+    if position is not None and position < len(gates) and gates[position] is gate:
+        return position
+    return None
+
+
+class Adjacency:
+    '''
+        CSR adjacency over a block of gates of a DAG
+        The neighbours of row i are the gates at indices[indptr[i]:indptr[i + 1]], sorted by position
+    '''
+    __slots__ = ('gates', 'indptr', 'indices')
+
+    def __init__(self, gates, neighbours):
+        self.gates = gates
+        self.indptr = np.zeros(len(neighbours) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(row) for row in neighbours])
+        self.indices = np.fromiter(
+            (position for row in neighbours for position in sorted(neighbour.compact_index for neighbour in row)),
+            dtype=np.int32,
+            count=int(self.indptr[-1])
+        )
+
+    def __getitem__(self, index):
+        gates = self.gates
+        return [gates[i] for i in self.indices[self.indptr[index]:self.indptr[index + 1]].tolist()]
+
+    def degree(self, index):
+        return int(self.indptr[index + 1] - self.indptr[index])
+
+    def contains(self, index, position):
+        '''
+            Checks if the gate at a position is adjacent to row index
+        '''
+        row = self.indices[self.indptr[index]:self.indptr[index + 1]]
+        offset = bisect_left(row, position)
+        return offset < len(row) and row[offset] == position
+
+
+class AdjacencyView(MutableSet):
+    '''
+        Set of adjacent gates read from a CSR adjacency
+        The first mutation copies the adjacent gates into a set held by this view
+    '''
+    __slots__ = ('adjacency', 'index', 'owned')
+
+    def __init__(self, adjacency, index):
+        self.adjacency = adjacency
+        self.index = index
+        self.owned = None
+
+    def __iter__(self):
+        if self.owned is not None:
+            return iter(self.owned)
+        return iter(self.adjacency[self.index])
+
+    def __len__(self):
+        if self.owned is not None:
+            return len(self.owned)
+        return self.adjacency.degree(self.index)
+
+    def __contains__(self, gate):
+        if self.owned is not None:
+            return gate in self.owned
+
+        # Binds compare equal to the gate that they wrap
+        position = gate_position(self.adjacency.gates, getattr(gate, 'obj', gate))
+        if position is not None:
+            return self.adjacency.contains(self.index, position)
+        return any(neighbour == gate for neighbour in self.adjacency[self.index])
+
+    def __repr__(self):
+        return f"{{{', '.join(map(repr, self))}}}"
+
+    def add(self, gate):
+        self.thaw().add(gate)
+
+    def discard(self, gate):
+        self.thaw().discard(gate)
+
+    def thaw(self):
+        '''
+            Copies the adjacent gates to a set owned by this view
+        '''
+        if self.owned is None:
+            self.owned = set(self.adjacency[self.index])
+        return self.owned
+
+
+class Edges:
+    '''
+        CSR edges keyed on symbols over a block of gates of a DAG
+        The edges of row i map keys[indptr[i]:indptr[i + 1]] to the gates at the same positions of indices
+    '''
+    __slots__ = ('gates', 'indptr', 'keys', 'indices')
+
+    def __init__(self, gates, edges):
+        self.gates = gates
+        self.indptr = np.zeros(len(edges) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(row) for row in edges])
+        self.keys = np.empty(int(self.indptr[-1]), dtype=object)
+        self.keys[:] = [key for row in edges for key in row]
+        self.indices = np.fromiter(
+            (gate.compact_index for row in edges for gate in row.values()),
+            dtype=np.int32,
+            count=int(self.indptr[-1])
+        )
+
+    def __getitem__(self, index):
+        start, end = self.indptr[index], self.indptr[index + 1]
+        gates = self.gates
+        return list(zip(self.keys[start:end].tolist(), (gates[i] for i in self.indices[start:end].tolist())))
+
+    def degree(self, index):
+        return int(self.indptr[index + 1] - self.indptr[index])
+
+
+class EdgeView(MutableMapping):
+    '''
+        Mapping of symbols to adjacent gates read from CSR edges
+        Keys match as they would in a dict, the first mutation copies the edges into a dict held by this view
+    '''
+    __slots__ = ('edges', 'index', 'owned')
+
+    def __init__(self, edges, index):
+        self.edges = edges
+        self.index = index
+        self.owned = None
+
+    def __getitem__(self, key):
+        if self.owned is not None:
+            return self.owned[key]
+        key_hash = hash(key)
+        for edge_key, gate in self.edges[self.index]:
+            if edge_key is key or (hash(edge_key) == key_hash and edge_key == key):
+                return gate
+        raise KeyError(key)
+
+    def __iter__(self):
+        if self.owned is not None:
+            return iter(self.owned)
+        return iter([key for key, _ in self.edges[self.index]])
+
+    def __len__(self):
+        if self.owned is not None:
+            return len(self.owned)
+        return self.edges.degree(self.index)
+
+    def __repr__(self):
+        return repr(dict(self.edges[self.index]) if self.owned is None else self.owned)
+
+    def __setitem__(self, key, gate):
+        self.thaw()[key] = gate
+
+    def __delitem__(self, key):
+        del self.thaw()[key]
+
+    def thaw(self):
+        '''
+            Copies the edges to a dict owned by this view
+        '''
+        if self.owned is None:
+            self.owned = dict(self.edges[self.index])
+        return self.owned
+
+
+def register_gates(dag, gates):
+    '''
+        Appends gates to the gates registered for compaction, recording the position of each
+    '''
+    registered = dag.registered_gates
+    for gate in gates:
+        if gate_position(registered, gate) is None:
+            gate.compact_index = len(registered)
+            registered.append(gate)
+
+def compacted(gate):
+    '''
+        Checks if all containers of a gate are views that have not been copied
+    '''
+    return all(
+        isinstance(container, (AdjacencyView, EdgeView)) and container.owned is None
+        for container in (gate.predicates, gate.antecedents, gate.back_edges, gate.forward_edges)
+    )
+
+def compact_gates(dag, gates):
+    '''
+        Replaces the predicate and antecedent sets and the edge dicts of the gates with views over a new block of CSR arrays
+        Gates that are already compacted or that have a neighbour that is not registered keep their containers
+    '''
+    registered = dag.registered_gates
+    n_registered = len(registered)
+
+    def registered_neighbour(neighbour):
+        position = getattr(neighbour, 'compact_index', None)
+        return position is not None and position < n_registered and registered[position] is neighbour
+
+    def compactable(gate):
+        if compacted(gate):
+            return False
+        neighbours = chain(gate.predicates, gate.antecedents, gate.back_edges.values(), gate.forward_edges.values())
+        return all(map(registered_neighbour, neighbours))
+
+    gates = [gate for gate in gates if compactable(gate)]
+    if len(gates) == 0:
+        return
+    predicates = Adjacency(registered, [gate.predicates for gate in gates])
+    antecedents = Adjacency(registered, [gate.antecedents for gate in gates])
+    back_edges = Edges(registered, [gate.back_edges for gate in gates])
+    forward_edges = Edges(registered, [gate.forward_edges for gate in gates])
+
+    for i, gate in enumerate(gates):
+        gate.predicates = AdjacencyView(predicates, i)
+        gate.antecedents = AdjacencyView(antecedents, i)
+        gate.back_edges = EdgeView(back_edges, i)
+        gate.forward_edges = EdgeView(forward_edges, i)
+
+def compact_dag(dag):
+    '''
+        Replaces the predicate and antecedent sets and the edge dicts of each gate in the DAG with views over CSR arrays
+        Gates with a neighbour outside the DAG keep their own containers
+        Gates added after compaction are compacted by the next call
+    '''
+    if getattr(dag, 'registered_gates', None) is None:
+        dag.registered_gates = []
+    register_gates(dag, dag.gates)
+    compact_gates(dag, dag.gates)
+    return dag
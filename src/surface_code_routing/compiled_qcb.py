@@ -2,6 +2,8 @@
     Compiled QCB
     Binds a set of routing instructions to a QCB layout to create a callable  
 '''
+import numpy as np
+
 from surface_code_routing.symbol import symbol_resolve
 from surface_code_routing.scope import Scope
 from surface_code_routing.instructions import RESET, MOVE, IDLE
@@ -13,6 +15,7 @@ from surface_code_routing.qcb_graph import QCBGraph
 from surface_code_routing.qcb_tree import QCBTree
 from surface_code_routing.router import QCBRouter
 from surface_code_routing.mapper import QCBMapper
+from surface_code_routing.placement import ANNEALING
 
 from surface_code_routing.circuit_model import PatchGraph
 from surface_code_routing.inject_rotations import RotationInjector
@@ -68,7 +71,9 @@ def compile_qcb(dag, height, width,
 
     if verbose:
         print("\tRouting...")
-    circuit_model = PatchGraph(qcb.shape, mapper, None)
+    if patch_graph_kwargs is None:
+        patch_graph_kwargs = dict()
+    circuit_model = PatchGraph(qcb.shape, mapper, None, **patch_graph_kwargs)
     # TODO pass this through
     rot_injector = RotationInjector(dag, mapper, qcb, graph=circuit_model, verbose=verbose)
 
@@ -81,6 +86,38 @@ def compile_qcb(dag, height, width,
     compiled_qcb = CompiledQCB(qcb, router, dag, **compiled_qcb_kwargs)
     return compiled_qcb
 
+def compile_qcb_annealed(dag_constructor, height, width,
+                         *externs,
+                         n_candidates=4,
+                         time_budget=1,
+                         n_iterations=None,
+                         seed=None,
+                         mapper_kwargs=None,
+                         **compile_kwargs
+                         ):
+    '''
+        Compiles several candidate placements refined by simulated annealing and routes each in full
+        Returns the compiled QCB with the least space time volume
+        :: dag_constructor : callable :: Constructs the DAG, routing modifies the DAG so each candidate is compiled from a new DAG
+        :: n_candidates : int :: Number of independently annealed placements to route
+        :: time_budget : float :: Seconds to anneal each candidate for
+        :: n_iterations : int :: Number of swaps to anneal each candidate for
+        :: seed : int :: Seeds the annealing of the candidates
+        Remaining arguments are passed to compile_qcb
+    '''
+    seeds = np.random.default_rng(seed).integers(2 ** 32, size=n_candidates)
+
+    best = None
+    for candidate_seed in seeds.tolist():
+        candidate_kwargs = dict() if mapper_kwargs is None else dict(mapper_kwargs)
+        candidate_kwargs['placement'] = ANNEALING
+        candidate_kwargs['placement_kwargs'] = {'time_budget': time_budget, 'n_iterations': n_iterations, 'seed': candidate_seed}
+
+        compiled_qcb = compile_qcb(dag_constructor(), height, width, *externs, mapper_kwargs=candidate_kwargs, **compile_kwargs)
+        if best is None or compiled_qcb.space_time_volume() < best.space_time_volume():
+            best = compiled_qcb
+    return best
+
 class CompiledQCB:
     '''
         CompiledQCB
@@ -7,4 +7,7 @@ ELBOW_ANCILLAE = AddrBind('elbow')
 # Used by Allocators
 COULD_NOT_ALLOCATE = AddrBind("Failed to Allocate Patch")
 
+# Used by DAG compilation
+EXCEEDED_CYCLE_BUDGET = AddrBind("Exceeded Cycle Budget")
+
 COULD_NOT_ROUTE = Symbol('ROUTE')
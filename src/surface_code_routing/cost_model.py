@@ -0,0 +1,61 @@
+'''
+    Cost Model
+    Per patch routing weights derived from the proximity and congestion statistics of the DAG
+'''
+import numpy as np
+
+def register_coordinates(dag, mapper):
+    '''
+        Coordinates of each mapped register in the physical lookup of the DAG
+        Returns a dict keyed on the lookup index, externs are not placed until routing and are skipped
+    '''
+    coordinates = dict()
+    for index, symbol in enumerate(dag.internal_scope().keys()):
+        segment_map = mapper.map.get(symbol)
+        if segment_map is None:
+            continue
+        try:
+            coordinates[index] = segment_map[symbol]
+        except KeyError:
+            continue
+    return coordinates
+
+def channel_demand(shape, coordinates, proximity, congestion):
+    '''
+        Expected number of routes through each patch
+        Each pair of interacting registers spreads its proximity evenly over the bounding box between them
+        Pairs of registers that are busy on the same layers as many other gates are scaled up by their congestion
+    '''
+    demand = np.zeros(shape)
+    busy = congestion.sum(axis=1)
+    max_busy = max(busy.max(initial=0), 1)
+
+    indices = sorted(coordinates)
+    for i, index in enumerate(indices):
+        for other_index in indices[i + 1:]:
+            weight = proximity[index, other_index] + proximity[other_index, index]
+            if weight == 0:
+                continue
+            weight *= 1 + (busy[index] + busy[other_index]) / (2 * max_busy)
+
+            (y_0, x_0), (y_1, x_1) = coordinates[index], coordinates[other_index]
+            y_0, y_1 = min(y_0, y_1), max(y_0, y_1)
+            x_0, x_1 = min(x_0, x_1), max(x_0, x_1)
+            demand[y_0:y_1 + 1, x_0:x_1 + 1] += weight / ((y_1 - y_0 + 1) * (x_1 - x_0 + 1))
+    return demand
+
+def patch_weights(graph, dag, mapper, scale=1):
+    '''
+        Routing weight of each patch, routing channels carrying the most demand cost 1 + scale
+        All other patches cost 1 so the A* heuristic remains admissible
+    '''
+    proximity, _ = dag.calculate_physical_proximity()
+    congestion, _ = dag.calculate_physical_conjestion()
+    demand = channel_demand(graph.shape, register_coordinates(dag, mapper), proximity, congestion)
+
+    weights = np.ones(graph.shape)
+    channels = graph.state_codes == graph.STATE_ROUTE
+    max_demand = demand[channels].max(initial=0)
+    if max_demand > 0:
+        weights[channels] += scale * demand[channels] / max_demand
+    return weights
@@ -1,5 +1,6 @@
 import numpy as np
-from heapq import heappush
+from heapq import heappush, heappop
+from collections import deque
 
 from itertools import chain
 from functools import reduce
@@ -12,6 +13,28 @@ from surface_code_routing import utils
 sys.setrecursionlimit(10000)
 
 class DAGNode():
+    __slots__ = (
+        'symbol',
+        'scope',
+        'externs',
+        'predicates',
+        'antecedents',
+        'predicate_factories',
+        'back_edges',
+        'forward_edges',
+        'n_ancillae',
+        'ancillae_type',
+        'layer',
+        'slack',
+        'gates',
+        'layers',
+        'compact_index',
+        '__is_factory',
+        '__n_cycles',
+        '__rotates',
+        '__weakref__',
+    )
+
     def __init__(self, symbol, *args, scope=None, externs=None, n_cycles=1, n_ancillae=0, rotation=False, ancillae_type=None, is_factory=None):
         symbol = symbol_resolve(symbol)
         if externs is None:
@@ -184,6 +207,12 @@ class DAG(DAGNode):
 
     def add_gate(self, dag, *args, scope=None, **kwargs):
 
+        # Instruction templates are stamped into this DAG rather than unrolled
+        if isinstance(dag, Instruction):
+            if scope is None and dag.stampable():
+                return dag.stamp(self)
+            dag = dag.materialise()
+
         gate = dag(scope=scope)
 
         operands = gate.symbol.io
@@ -286,58 +315,31 @@ class DAG(DAGNode):
         self.symbol.inject(scope)
         return
 
+    def compact(self):
+        '''
+            Replaces the predicate and antecedent sets and the edge dicts of each gate with views over CSR arrays
+            Reduces the memory held by large DAGs, the views copy on the first mutation
+        '''
+        return compact_dag(self)
+
     def calculate_logical_proximity(self):
-        prox_len = len(self.scope)
-        prox = np.zeros((prox_len, prox_len))
         lookup = dict(map(lambda x: x[::-1], enumerate(self.scope.keys())))
-
-        for layer in self.layers:
-            for gate in layer:
-                for targ in gate.scope:
-                    for other_targ in gate.scope:
-                        if other_targ is not targ:
-                            prox[lookup[targ], lookup[other_targ]] += 1
+        operands = self.operand_indices(lookup.__getitem__)
+        prox = operand_pair_counts(chain.from_iterable(operands), len(lookup))
         return prox, lookup
 
     def calculate_logical_conjestion(self):
-        conj_len = len(self.scope)
-        conj = np.zeros((conj_len, conj_len))
         lookup = dict(map(lambda x: x[::-1], enumerate(self.scope.keys())))
-
-        for layer in self.layers:
-            for gate in layer:
-                if len(gate.scope) > 1:
-                    for other_gate in layer:
-                        if gate is not other_gate and len(other_gate.scope) > 1:
-                            for targ in gate.scope:
-                                for other_targ in other_gate.scope:
-                                    conj[lookup[targ], lookup[other_targ]] += 1
+        operands = self.operand_indices(lookup.__getitem__)
+        conj = operand_layer_congestion(operands, len(lookup))
         return conj, lookup
 
 
     def calculate_physical_conjestion(self):
-        conj_len = len(self.internal_scope()) + len(self.physical_externs)
-        conj = np.zeros((conj_len, conj_len))
-
         lookup_inv = list(chain(self.internal_scope().keys(), self.physical_externs))
         lookup = dict(map(lambda x: x[::-1], enumerate(lookup_inv)))
-
-        for layer in self.layers:
-            for gate in layer:
-                if len(gate.scope) > 1:
-                    for other_gate in layer:
-                        if gate is not other_gate and len(other_gate.scope) > 1:
-                            for targ in gate.scope:
-                                for other_targ in other_gate.scope:
-                                    tmp_targ = targ.get_parent()
-                                    tmp_other_targ = other_targ.get_parent()
-
-                                    if tmp_targ.is_extern():
-                                        tmp_targ = self.scope[tmp_targ]
-                                    if tmp_other_targ.is_extern():
-                                        tmp_other_targ = self.scope[tmp_other_targ]
-
-                                    conj[lookup[tmp_targ], lookup[tmp_other_targ]] += 1
+        operands = self.operand_indices(self.physical_index(lookup))
+        conj = operand_layer_congestion(operands, len(lookup_inv))
         return conj, lookup
 
     def lookup(self):
@@ -349,36 +351,53 @@ class DAG(DAGNode):
                 lookup_list.append(element.get_symbol())
 
             else:
-                sym = symbol_resolve(element)
+                # Resolved symbols are shared between DAGs, the register predicate is set on a copy held by this lookup
+                sym = Symbol(element)
                 sym.predicate = register
                 lookup_list.append(sym)
         return lookup_list
 
     def calculate_physical_proximity(self):
-        prox_len = len(self.internal_scope()) + len(self.physical_externs)
-        prox = np.zeros((prox_len, prox_len))
         lookup_inv = list(chain(self.internal_scope().keys(), self.physical_externs))
         lookup = dict(map(lambda x: x[::-1], enumerate(lookup_inv)))
-
-        for layer in self.layers:
-            for gate in layer:
-                for targ in gate.scope:
-                    for other_targ in gate.scope:
-                        if other_targ is not targ:
-
-                            tmp_targ = targ.get_parent()
-                            tmp_other_targ = other_targ.get_parent()
-
-                            if tmp_targ.is_extern():
-                                tmp_targ = self.scope[tmp_targ]
-                            if tmp_other_targ.is_extern():
-                                tmp_other_targ = self.scope[tmp_other_targ]
-
-                            prox[lookup[tmp_targ], lookup[tmp_other_targ]] += 1
-
+        operands = self.operand_indices(self.physical_index(lookup))
+        prox = operand_pair_counts(chain.from_iterable(operands), len(lookup_inv))
         return prox, lookup
 
-    def compile(self, n_channels, *externs, extern_minimise=lambda extern: extern.n_cycles(), debug=False, exact_alloc=True):
+    def physical_index(self, lookup):
+        '''
+            Maps operands to their index in the physical lookup
+            Operands resolve to their parent register, externs resolve to their bound physical extern
+        '''
+        cache = dict()
+        def resolve(targ):
+            index = cache.get(targ)
+            if index is None:
+                tmp_targ = targ.get_parent()
+                if tmp_targ.is_extern():
+                    tmp_targ = self.scope[tmp_targ]
+                index = lookup[tmp_targ]
+                cache[targ] = index
+            return index
+        return resolve
+
+    def operand_indices(self, resolve):
+        '''
+            Lookup indices of the operands of each gate, grouped by layer
+        '''
+        return [[[resolve(targ) for targ in gate.scope] for gate in layer] for layer in self.layers]
+
+    def compile(self, n_channels, *externs, extern_minimise=lambda extern: extern.n_cycles(), debug=False, exact_alloc=True, event_driven=False, cycle_budget=None, priority=None):
+        '''
+            Simulates execution of the DAG over a number of channels and a set of physical externs
+            :: event_driven : bool :: Use the event queue implementation 
+            :: cycle_budget : int :: Stop early once the number of cycles exceeds this budget
+            :: priority : str :: Scheduling policy for waiting gates, one of PRIORITY_POLICIES, by default gates are sorted on their bind
+            Returns the number of cycles and the gates active on each cycle
+            If the budget is exceeded the number of cycles is replaced by EXCEEDED_CYCLE_BUDGET
+        '''
+        if event_driven:
+            return self.compile_event_driven(n_channels, *externs, extern_minimise=extern_minimise, debug=debug, exact_alloc=exact_alloc, cycle_budget=cycle_budget, priority=priority)
 
         # Clear any previous extern allocation
         self.externs.clear_scope()
@@ -392,6 +411,12 @@ class DAG(DAGNode):
             assert(all(any(map(lambda i: i.satisfies(extern), self.physical_externs)) for extern in self.externs.keys()))
 
 
+        # Sort keys for the waiting list
+        waiting_priorities = None if priority is None else priorities(self.gates, priority)
+
+        # Gates that resolve on the same cycle release their antecedents in this order
+        resolution_order = dag_order(self.gates)
+
         # Map of physical externs to binds 
         # This tracks the state of the input externs
         extern_map = dict(zip(self.physical_externs, map(ExternBind, externs)))
@@ -443,7 +468,7 @@ class DAG(DAGNode):
         # Gates that have finished, how many cycles this took, what happened in each layer
         resolved = set()
         n_cycles = 0
-        layers = []
+        layers = Timeline()
 
         # This is a semaphore
         active_non_local_gates = 0
@@ -457,13 +482,17 @@ class DAG(DAGNode):
             layers.append([])
             n_cycles += 1
 
+            # Worse than the budget, no need to finish
+            if cycle_budget is not None and n_cycles > cycle_budget:
+                return EXCEEDED_CYCLE_BUDGET, layers
+
             # Update each active gate
             for gate in active:
-                layers[-1].append(gate)
+                layers.add(gate, len(layers) - 1)
                 gate.cycle()
 
-            # Non-extern gates resolve directly
-            recently_resolved = list(filter(lambda x: x.resolved(), active))
+            # Non-extern gates resolve directly, in the order of the DAG rather than of the active set
+            recently_resolved = sorted(filter(lambda x: x.resolved(), active), key=resolution_order)
 
             # Active gate set reduces to the unresolved gates 
             active = set(filter(lambda x: not x.resolved(), active))
@@ -486,8 +515,7 @@ class DAG(DAGNode):
                         gate.cycle(step=fast_forward)
 
                     # Update layers
-                    for _ in range(fast_forward):  
-                        layers.append(list(layers[-1]))
+                    layers.repeat(fast_forward)
 
                     n_cycles += fast_forward
 
@@ -533,7 +561,7 @@ class DAG(DAGNode):
                         externs_first_free_cycle[extern_bind] = len(layers)
 
             # Sort the waiting list based on the current slack
-            waiting.sort()
+            sort_waiting(waiting, waiting_priorities)
             for gate in waiting:
                 # If it's an extern gate then see if a free resource exists
                 if gate.is_extern():
@@ -559,8 +587,7 @@ class DAG(DAGNode):
                             previous_cycles = min(binding.n_cycles(), len(layers) - last_free_cycle)
                             gate.set_cycles_completed(previous_cycles)
                             binding.set_cycles_completed(previous_cycles)
-                            for layer in layers[last_free_cycle:]:
-                                layer.append(gate)
+                            layers.add_span(gate, last_free_cycle, len(layers))
                         active.add(gate)
 
                 else:
@@ -584,13 +611,259 @@ class DAG(DAGNode):
         self.compiled_layers = layers
         return n_cycles, layers
 
+    def compile_event_driven(self, n_channels, *externs, extern_minimise=lambda extern: extern.n_cycles(), debug=False, exact_alloc=True, cycle_budget=None, priority=None):
+        '''
+            Event queue implementation of compile
+            Gate completions are held on a min-heap and cycles on which no gate resolves are skipped
+            Antecedents are released using counters of unresolved predicates
+            Idle externs are indexed by the symbol that they satisfy
+            Returns the same (n_cycles, layers) as compile
+        '''
+        # Clear any previous extern allocation
+        self.externs.clear_scope()
+        self.physical_externs = list(externs)
+
+        # Check I have enough channels
+        assert(n_channels > 0)
+
+        # Check that all externs are mapped
+        if exact_alloc:
+            assert(all(any(map(lambda i: i.satisfies(extern), self.physical_externs)) for extern in self.externs.keys()))
+
+        waiting_priorities = None if priority is None else priorities(self.gates, priority)
+        resolution_order = dag_order(self.gates)
+
+        # Map of physical externs to binds 
+        extern_map = dict(zip(self.physical_externs, map(ExternBind, externs)))
+        externs_first_free_cycle = {extern: 0 for extern in extern_map.values()}
+
+        extern_gate_to_bind = (
+            lambda gate: extern_map[
+                self.externs[gate.get_unary_symbol()]
+            ]
+        )
+
+        # Currently unallocated externs, keyed by the symbol they satisfy
+        # Each queue preserves the extern_minimise ordering
+        idle_externs = dict()
+        for extern in sorted(extern_map.values(), key=extern_minimise):
+            idle_externs.setdefault(extern_symbol_key(extern), deque()).append(extern)
+        n_idle_externs = len(extern_map)
+
+        # Number of unresolved predicates for each gate
+        n_unresolved = dict()
+        dependents = dict()
+        for gate in self.gates:
+            n_unresolved[id(gate)] = len(gate.predicates)
+            for predicate in gate.predicates:
+                dependents.setdefault(id(predicate), list()).append(gate)
+
+        # Cycles on which active gates resolve
+        completions = []
+
+        active = set()
+        waiting = list()
+
+        n_cycles = 0
+        layers = Timeline()
+        active_non_local_gates = 0
+
+        for gate in self.layers[0]:
+            if gate.is_factory():
+                continue
+
+            if gate.is_extern():
+                bindings = idle_externs.get(extern_gate_symbol_key(gate))
+                if bindings:
+                    binding = bindings.popleft()
+                    n_idle_externs -= 1
+                    self.externs[gate.get_unary_symbol()] = binding.get_obj()
+                    self.scope[gate.get_unary_symbol()] = binding.get_obj()
+
+                    gate = ExternDAGBind(gate, binding)
+                    active.add(gate)
+                    heappush(completions, n_cycles + max(gate.n_cycles() - gate.curr_cycle(), 1))
+                else:
+                    waiting.append(ExternBind(gate))
+            else:
+                gate = DAGBind(gate)
+                active.add(gate)
+                heappush(completions, n_cycles + max(gate.n_cycles() - gate.curr_cycle(), 1))
+
+        while len(active) > 0 or len(waiting) > 0:
+
+            # No gates resolve until the next event, skip to it 
+            if len(active) > 0 and (n_quiet := completions[0] - n_cycles - 1) > 0:
+                self.debug_print(f"Fast Forward: {n_quiet}")
+                layers.append(list(active))
+                layers.repeat(n_quiet - 1)
+
+                for gate in active:
+                    gate.cycle(step=n_quiet)
+                n_cycles += n_quiet
+
+            layers.append([])
+            n_cycles += 1
+
+            if cycle_budget is not None and n_cycles > cycle_budget:
+                return EXCEEDED_CYCLE_BUDGET, layers
+
+            # Single pass over the active gates
+            recently_resolved = list()
+            unresolved = set()
+            for gate in active:
+                layers.add(gate, len(layers) - 1)
+                gate.cycle()
+                if gate.resolved():
+                    recently_resolved.append(gate)
+                else:
+                    unresolved.add(gate)
+            active = unresolved
+
+            while len(completions) > 0 and completions[0] <= n_cycles:
+                heappop(completions)
+
+            if len(recently_resolved) == 0 and len(active) > 0:
+                continue
+            recently_resolved.sort(key=resolution_order)
+
+            for gate in recently_resolved:
+                if gate.non_local():
+                    active_non_local_gates -= 1
+
+                for dependent in dependents.get(id(gate.obj), tuple()):
+                    n_unresolved[id(dependent)] -= 1
+
+                for antecedent in gate.antecedents():
+                    if n_unresolved[id(antecedent)] == 0:
+                        if antecedent.is_extern():
+                            waiting.append(ExternBind(antecedent))
+                        else:
+                            waiting.append(DAGBind(antecedent))
+
+                # Unlock Externs For Reallocation
+                if gate.get_symbol() == RESET_SYMBOL:
+                    extern_bind = extern_gate_to_bind(gate)
+                    extern_bind.reset()
+                    idle_externs.setdefault(extern_symbol_key(extern_bind), deque()).append(extern_bind)
+                    n_idle_externs += 1
+                    externs_first_free_cycle[extern_bind] = len(layers)
+
+            sort_waiting(waiting, waiting_priorities)
+            for gate in waiting:
+                if gate.is_extern():
+                    if n_idle_externs == 0:
+                        continue
+
+                    bindings = idle_externs.get(extern_gate_symbol_key(gate))
+                    if not bindings:
+                        continue
+
+                    binding = bindings.popleft()
+                    n_idle_externs -= 1
+
+                    self.externs[gate.get_unary_symbol()] = binding.get_obj()
+                    self.scope[gate.get_unary_symbol()] = binding.get_obj()
+                    gate = gate.bind_physical_extern(binding)
+
+                    # Pre-warming factories
+                    if gate.is_factory():
+                        last_free_cycle = externs_first_free_cycle[binding]
+                        previous_cycles = min(binding.n_cycles(), len(layers) - last_free_cycle)
+                        gate.set_cycles_completed(previous_cycles)
+                        binding.set_cycles_completed(previous_cycles)
+                        layers.add_span(gate, last_free_cycle, len(layers))
+                else:
+                    if gate.non_local():
+                        if active_non_local_gates >= n_channels:
+                            continue
+                        active_non_local_gates += 1
+
+                active.add(gate)
+                heappush(completions, n_cycles + max(gate.n_cycles() - gate.curr_cycle(), 1))
+
+            waiting = list(filter(lambda x: x not in active, waiting))
+
+        self.compiled_layers = layers
+        return n_cycles, layers
+
     def __tikz__(self):
         return tikz_dag(self)
 
 
-from surface_code_routing.symbol import symbol_resolve, Symbol
+from surface_code_routing.symbol import symbol_resolve, Symbol, ExternSymbol
 from surface_code_routing.scope import Scope
 from surface_code_routing.instructions import INIT, RESET_SYMBOL, IDLE_SYMBOL, INIT_SYM
+from surface_code_routing.instruction_template import Instruction
 from surface_code_routing.bind import DAGBind, ExternBind, ExternDAGBind
 from surface_code_routing.tikz_utils import tikz_dag
+from surface_code_routing.timeline import Timeline
+from surface_code_routing.constants import EXCEEDED_CYCLE_BUDGET
+from surface_code_routing.priority import priorities, bound_node
+from surface_code_routing.compact_dag import compact_dag
 import copy
+
+def extern_symbol_key(extern):
+    '''
+        Key of the symbol satisfied by a physical extern
+    '''
+    return extern.get_symbol().predicate.symbol
+
+def extern_gate_symbol_key(gate):
+    '''
+        Key of the symbol required by an extern gate
+        Mirrors ExternSymbol.satisfies
+    '''
+    predicate = gate.get_symbol().predicate
+    if isinstance(predicate, ExternSymbol):
+        return predicate.predicate.symbol
+    return predicate.symbol
+
+def dag_order(gates):
+    '''
+        Sort key of binds on the position of their gate in the DAG
+    '''
+    positions = {id(gate): position for position, gate in enumerate(gates)}
+    return lambda gate: positions[id(bound_node(gate))]
+
+def sort_waiting(waiting, waiting_priorities):
+    '''
+        Sorts the waiting list, either on the binds or on the priority of each gate
+    '''
+    if waiting_priorities is None:
+        waiting.sort()
+    else:
+        waiting.sort(key=lambda gate: waiting_priorities[id(bound_node(gate))])
+
+def operand_pair_counts(operands, size, distinct=True):
+    '''
+        Counts the ordered pairs of operands within each gate
+        Gates are grouped by their number of operands so that each group is accumulated with a single np.add.at
+        :: distinct : bool :: Only pair operands in different positions of the gate
+    '''
+    counts = np.zeros((size, size))
+    groups = dict()
+    for indices in operands:
+        groups.setdefault(len(indices), []).append(indices)
+
+    for arity, group in groups.items():
+        group = np.array(group, dtype=np.int64).reshape(len(group), arity)
+        first, second = np.meshgrid(np.arange(arity), np.arange(arity), indexing='ij')
+        if distinct:
+            mask = first != second
+            first, second = first[mask], second[mask]
+        np.add.at(counts, (group[:, first.ravel()].ravel(), group[:, second.ravel()].ravel()), 1)
+    return counts
+
+def operand_layer_congestion(operands, size):
+    '''
+        Counts the pairs of operands of distinct multi-operand gates on the same layer
+        The per layer operand counts form the product of all pairs, pairs within a single gate are then removed
+    '''
+    layers = [[indices for indices in layer if len(indices) > 1] for layer in operands]
+    layer_index = [layer_idx for layer_idx, layer in enumerate(layers) for indices in layer for _ in indices]
+    operand_index = [index for layer in layers for indices in layer for index in indices]
+
+    layer_counts = np.zeros((len(layers), size))
+    np.add.at(layer_counts, (np.array(layer_index, dtype=np.int64), np.array(operand_index, dtype=np.int64)), 1)
+    return layer_counts.T @ layer_counts - operand_pair_counts(chain.from_iterable(layers), size, distinct=False)
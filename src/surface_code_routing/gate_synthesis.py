@@ -3,6 +3,7 @@ import subprocess
 from surface_code_routing.dag import DAG
 from surface_code_routing.symbol import Symbol
 from surface_code_routing.scope import Scope
+from surface_code_routing.instruction_template import InstructionTemplate
 from surface_code_routing.instructions import Hadamard, Phase, X, Z
 from surface_code_routing.lib_instructions import T
 
@@ -54,7 +55,9 @@ class GateSynth:
                 if gate is not None:
                     dag.add_gate(gate(targ))
             return dag
-        return instruction
+
+        gates = tuple(gate_dict[op] for op in op_sequence if op in gate_dict)
+        return InstructionTemplate(instruction, lambda arity: tuple((gate, (0,), ()) for gate in gates), arity=1)
 
     def __del__(self):
         self.proc.terminate()
@@ -113,6 +113,10 @@ class RotationInjector():
                 rotation_gate.predicates.add(predicate_gate)
                 rotation_gate.antecedents.add(dag_node)
 
+                # Shares the layer of the gate it precedes, ordering on layers then on the DAG keeps the rotation first
+                rotation_gate.layer = dag_node.layer
+                rotation_gate.slack = 0
+
                 injected_gates.append(rotation_gate)
                 self.dag.gates.insert(dag_index, rotation_gate)
                 index_tracker += 1 
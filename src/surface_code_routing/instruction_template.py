@@ -0,0 +1,140 @@
+'''
+    Instruction Templates
+    Stores the shape of each instruction once and stamps its gates directly into the DAG it is added to
+'''
+from surface_code_routing.symbol import Symbol, symbol_resolve
+
+class GateTemplate:
+    '''
+        Shape of a single gate of an instruction
+        The operands of the gate are substituted when it is stamped
+    '''
+    __slots__ = ('symbol', 'kwargs')
+
+    def __init__(self, symbol, **kwargs):
+        self.symbol = symbol
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return f"GateTemplate: {self.symbol}"
+
+    def stamp(self, dag, io_in, io_out):
+        '''
+            Adds a gate over the operands to the dag
+        '''
+        symbol = Symbol(self.symbol, io_in, io_out)
+
+        # Injecting the operands re-inserts the io of the symbol, this keeps the io order of an unrolled instruction DAG
+        if len(symbol.io) > 1:
+            symbol.inject({dep: dep for dep in symbol.io})
+
+        gate = DAGNode(symbol, **self.kwargs)
+
+        # Matches the edges left on the gate by an unrolled instruction DAG
+        gate.forward_edges = {dep: gate for dep in symbol.io}
+
+        dag.gates.append(gate)
+        dag.merge_scopes(gate)
+        dag.update_dependencies(gate)
+        return gate
+
+
+class InstructionTemplate:
+    '''
+        Instruction whose gates are stamped directly into a DAG rather than unrolled from a DAG of its own
+        :: build : callable :: Constructs the instruction DAG, used when the instruction is not stamped
+        :: shape : callable :: Maps an arity to a tuple of (gate, io_in, io_out) steps
+            io_in and io_out index the operands, gates are either gate templates or instructions
+            instructions are applied to the io_in operands and should have no io_out operands
+        :: arity : int :: Number of operands taken by a fixed arity build function, None for variadic instructions
+    '''
+    def __init__(self, build, shape, arity=None):
+        self.build = build
+        self.shape = shape
+        self.arity = arity
+        self.shapes = dict()
+
+    def __call__(self, *args):
+        if self.arity is not None and len(args) != self.arity:
+            raise TypeError(f"{self.build.__name__}() takes {self.arity} positional argument{'s' if self.arity != 1 else ''} but {len(args)} were given")
+        return self.instance(args, len(args), args)
+
+    def instance(self, operands, arity, build_args):
+        '''
+            Applies the instruction to the operands
+            build_args are passed to the build function if the instruction DAG is required
+        '''
+        return Instruction(self, tuple(map(symbol_resolve, operands)), arity, build_args)
+
+    def get_shape(self, arity):
+        '''
+            Shape of the instruction, traced once for each arity
+        '''
+        shape = self.shapes.get(arity)
+        if shape is None:
+            shape = tuple(self.shape(arity))
+            self.shapes[arity] = shape
+        return shape
+
+
+class Instruction:
+    '''
+        An instruction template applied to some operands
+        Adding this to a DAG stamps its gates, any other use builds the instruction DAG on first access
+    '''
+    __slots__ = ('template', 'operands', 'arity', 'build_args', 'dag')
+
+    def __init__(self, template, operands, arity, build_args):
+        self.template = template
+        self.operands = operands
+        self.arity = arity
+        self.build_args = build_args
+        self.dag = None
+
+    def __getattr__(self, attr):
+        return getattr(self.materialise(), attr)
+
+    def __getitem__(self, index):
+        return self.materialise()[index]
+
+    def __call__(self, scope=None):
+        return self.materialise()(scope=scope)
+
+    def __repr__(self):
+        return self.materialise().__repr__()
+
+    def materialise(self):
+        '''
+            Builds the instruction DAG
+        '''
+        if self.dag is None:
+            self.dag = self.template.build(*self.build_args)
+        return self.dag
+
+    def stampable(self):
+        '''
+            Externs are resolved through the scope of the instruction DAG and are not stamped
+        '''
+        return not any(operand.is_extern() for operand in self.operands)
+
+    def stamp(self, dag):
+        '''
+            Adds the gates of the instruction to the dag
+            Returns the added gates in the same manner as unrolling the instruction DAG
+        '''
+        operands = self.operands
+        gates = []
+        for gate, io_in, io_out in self.template.get_shape(self.arity):
+            args_in = tuple(operands[i] for i in io_in)
+            if isinstance(gate, GateTemplate):
+                gates.append(gate.stamp(dag, args_in, tuple(operands[i] for i in io_out)))
+                continue
+
+            stamped = dag.add_gate(gate(*args_in))
+            if isinstance(stamped, list):
+                gates += stamped
+            else:
+                gates.append(stamped)
+        return gates
+
+from surface_code_routing.dag import DAGNode
@@ -2,6 +2,7 @@ from functools import partial
 from itertools import chain
 from surface_code_routing.symbol import Symbol, ExternSymbol, symbol_map, symbol_resolve
 from surface_code_routing.scope import Scope
+from surface_code_routing.instruction_template import GateTemplate, InstructionTemplate
 from surface_code_routing.constants import SINGLE_ANCILLAE, ELBOW_ANCILLAE
 
 def in_place_factory(fn, **kwargs):
@@ -15,7 +16,9 @@ def in_place_factory(fn, **kwargs):
         dag = DAG(sym, scope=scope)
         dag.add_node(sym, **kwargs)
         return dag
-    return instruction
+
+    gate = GateTemplate(fn, **kwargs)
+    return InstructionTemplate(instruction, lambda arity: ((gate, (0,), ()),), arity=1)
 
 def pure_ancillae_instruction_factory(fn, **kwargs):
     '''
@@ -50,7 +53,7 @@ def in_place_factory_mult(fn, singular_instruction=None, **kwargs):
             dag.add_gate(singular_instruction(arg))
         
         return dag
-    return instruction
+    return InstructionTemplate(instruction, lambda arity: tuple((singular_instruction, (i,), ()) for i in range(arity)))
 
 def factory_factory(fn, **kwargs):
     def instruction(targ):
@@ -70,9 +73,7 @@ def non_local_factory(fn, n_cycles=1, n_ancillae=0, max_args=None):
     '''
     Factory method for generating non-local gates
     '''
-    def instruction(*args):
-        if (max_args is not None) and (len(args) > max_args):
-            raise Exception(f"Too many arguments: {fn} ({args})")
+    def build(*args):
         args = tuple(map(symbol_resolve, args))
         sym = Symbol(fn, args)
 
@@ -84,10 +85,18 @@ def non_local_factory(fn, n_cycles=1, n_ancillae=0, max_args=None):
         # This object is jointly initialised
         dag.add_node(sym, n_cycles=n_cycles)
         return dag
+
+    gate = GateTemplate(fn, n_cycles=n_cycles)
+    template = InstructionTemplate(build, lambda arity: ((gate, tuple(range(arity)), ()),))
+
+    def instruction(*args):
+        if (max_args is not None) and (len(args) > max_args):
+            raise Exception(f"Too many arguments: {fn} ({args})")
+        return template(*args)
     return instruction
 
 def ZX_factory(fn, **kwargs):
-    def instruction(z_args, x_args):
+    def build(z_args, x_args):
         args = tuple(map(symbol_resolve, chain(z_args, x_args)))
         sym = Symbol(fn, z_args, x_args)
         
@@ -97,6 +106,15 @@ def ZX_factory(fn, **kwargs):
         dag.add_node(sym, **kwargs)
         # This object is jointly initialised
         return dag
+
+    gate = GateTemplate(fn, **kwargs)
+    template = InstructionTemplate(
+        build,
+        lambda arity: ((gate, tuple(range(arity[0])), tuple(range(arity[0], arity[0] + arity[1]))),)
+    )
+
+    def instruction(z_args, x_args):
+        return template.instance(tuple(chain(z_args, x_args)), (len(z_args), len(x_args)), (z_args, x_args))
     return instruction
 
 INIT_SYM = "INIT"
@@ -6,10 +6,13 @@ from surface_code_routing.extern_patch_allocator_dynamic import ExternPatchAlloc
 from surface_code_routing.extern_patch_allocator_static import ExternPatchAllocatorStatic 
 from surface_code_routing.extern_patch_allocator_sized import ExternPatchAllocatorSized
 
+from surface_code_routing.priority import bound_node
+from surface_code_routing.placement import place_registers, TREE
+
 from surface_code_routing.constants import COULD_NOT_ALLOCATE
 
 class QCBMapper():
-    def __init__(self, dag, mapping_tree, extern_allocation_method='dynamic'):
+    def __init__(self, dag, mapping_tree, extern_allocation_method='dynamic', placement=TREE, placement_kwargs=None):
         self.dag = dag
         self.mapping_tree = mapping_tree
         self.qcb = mapping_tree.graph.qcb
@@ -32,6 +35,14 @@ class QCBMapper():
             'sized': ExternPatchAllocatorSized
         }.get(extern_allocation_method, None)(self) 
 
+        # Registers may be moved between the slots allocated by the tree once the externs are placed
+        self.placement = placement
+        if placement_kwargs is None:
+            placement_kwargs = dict()
+        place_registers(self, placement, **placement_kwargs)
+
+        self.construct_coordinate_table()
+
     def alloc_extern(self, symbol):
         return self.extern_allocator.alloc(symbol)
 
@@ -65,6 +76,18 @@ class QCBMapper():
             if leaf == TreeSlots.NO_CHILDREN_ERROR:
                 raise Exception(f"Could not allocate {symbol}")
 
+    def construct_coordinate_table(self):
+        '''
+            Coordinates of each register symbol, these are fixed once the registers are mapped
+            Also clears the coordinates cached for each gate, call this again if registers are moved
+        '''
+        self.coordinates = {
+            symbol: segment_map[symbol]
+            for symbol, segment_map in self.map.items()
+            if not symbol.is_extern() and segment_map is not None
+        }
+        self.gate_coordinates = dict()
+
     def dag_node_to_symbol_map(self, dag_node, rollback=False):
         for symbol in dag_node.scope:
             coords, rollback =  self.dag_symbol_to_coordinates(symbol)
@@ -76,6 +99,10 @@ class QCBMapper():
         return self.map[symbol].get_segment()
 
     def dag_symbol_to_coordinates(self, symbol):
+        coordinate = self.coordinates.get(symbol)
+        if coordinate is not None:
+            return coordinate, None
+
         if symbol.is_extern():
             # Allocator triggered here
             allocation_result, rollback = self.alloc_extern(symbol)
@@ -92,6 +119,12 @@ class QCBMapper():
             return segment_map[symbol], None
 
     def dag_node_to_coordinates(self, dag_node):
+        # Gates over registers always resolve to the same coordinates
+        gate = bound_node(dag_node)
+        coordinates = self.gate_coordinates.get(gate)
+        if coordinates is not None:
+            return list(coordinates)
+
         coordinates = list()
         rollback_alloc = list()
         for symbol in dag_node.scope:
@@ -107,6 +140,8 @@ class QCBMapper():
         # Bind the extern
         if dag_node.is_extern():
             dag_node.bind_extern(self.dag.externs[symbol])
+        elif all(symbol in self.coordinates for symbol in dag_node.scope):
+            self.gate_coordinates[gate] = tuple(coordinates)
         return coordinates 
 
     def lock_externs(self, dag_node):
@@ -0,0 +1,281 @@
+'''
+    Placement
+    Assignment of registers to the register slots allocated by the mapping tree
+'''
+from time import perf_counter
+import numpy as np
+
+from surface_code_routing.qcb import SCPatch
+
+TREE = 'tree'
+PROXIMITY = 'proximity'
+ANNEALING = 'annealing'
+
+PLACEMENT_POLICIES = (TREE, PROXIMITY, ANNEALING)
+
+# Number of swaps drawn at once by the annealer, the time budget is checked between batches
+ANNEALING_BATCH = 256
+# Final temperature of the annealing schedule as a fraction of the initial temperature
+ANNEALING_COOLING = 1e-3
+
+def register_slots(mapper):
+    '''
+        Movable registers and the slots they currently occupy
+        IO registers are fixed by the interface of the DAG and are not included
+        Returns a list of registers and a list of (segment map, offset) slots in the same order
+    '''
+    registers = []
+    slots = []
+    for symbol, segment_map in mapper.map.items():
+        if symbol.is_extern() or segment_map is None or segment_map.get_slot() != SCPatch.REG:
+            continue
+        registers.append(symbol)
+        slots.append((segment_map, segment_map.map[symbol]))
+    return registers, slots
+
+def slot_coordinates(slots):
+    '''
+        Patch coordinates of each slot
+    '''
+    return np.array(
+        [(segment_map.segment.y_1, segment_map.segment.x_0 + offset) for segment_map, offset in slots],
+        dtype=np.int64
+    ).reshape(len(slots), 2)
+
+def segment_distance(coordinates, segments):
+    '''
+        Manhattan distance from each coordinate to the nearest patch of any of the segments
+    '''
+    distance = np.full(len(coordinates), np.inf)
+    for segment in segments:
+        dy = np.maximum(np.maximum(segment.y_0 - coordinates[:, 0], coordinates[:, 0] - segment.y_1), 0)
+        dx = np.maximum(np.maximum(segment.x_0 - coordinates[:, 1], coordinates[:, 1] - segment.x_1), 0)
+        distance = np.minimum(distance, dy + dx)
+    return distance
+
+def anchor_distances(mapper, lookup, coordinates):
+    '''
+        Distance from each slot to each entry of the lookup that does not move
+        IO registers are anchored to their patch, externs to the nearest segment that may hold them
+        Returns the lookup indices of the anchors and a (slots, anchors) distance matrix
+    '''
+    indices = []
+    distances = []
+    for element, index in lookup.items():
+        symbol = element.get_symbol()
+        segment_map = mapper.map.get(symbol)
+        if segment_map is None:
+            continue
+        if symbol.is_extern():
+            segments = segment_map.get_physical_segments()
+            if len(segments) == 0:
+                continue
+            distances.append(segment_distance(coordinates, segments))
+        elif segment_map.get_slot() == SCPatch.IO:
+            y, x = segment_map[symbol]
+            distances.append(np.abs(coordinates[:, 0] - y) + np.abs(coordinates[:, 1] - x))
+        else:
+            continue
+        indices.append(index)
+    return indices, np.array(distances, dtype=float).reshape(len(indices), len(coordinates)).T
+
+def proximity_order(interactions, anchor_interactions, distances, anchor_distances):
+    '''
+        Greedy constructive placement
+        The register with the greatest interaction with those already placed, and with the anchors, is placed next
+        It takes the free slot that minimises its interaction weighted distance to the placed registers and to the anchors
+        :: interactions : (registers, registers) symmetric interaction weights
+        :: anchor_interactions : (registers, anchors) interaction weights
+        :: distances : (slots, slots) distances between slots
+        :: anchor_distances : (slots, anchors) distances from slots to anchors
+        Returns the slot index of each register
+    '''
+    n_registers = len(interactions)
+    assignment = np.full(n_registers, -1, dtype=np.int64)
+    free = np.ones(n_registers, dtype=bool)
+
+    # Pull towards the registers already placed, seeded from the anchors
+    placed_weight = anchor_interactions.sum(axis=1)
+    total_weight = interactions.sum(axis=1) + placed_weight
+    slot_cost = anchor_distances @ anchor_interactions.T
+
+    # Breaks ties towards central slots, this is less than any difference in interaction cost
+    centrality = distances.sum(axis=1)
+    slot_cost += (centrality / (centrality.max() + 1))[:, None]
+
+    unplaced = np.ones(n_registers, dtype=bool)
+    for _ in range(n_registers):
+        # Ties prefer the most connected register, then the register allocated first by the tree
+        candidates = np.flatnonzero(unplaced)
+        keys = np.lexsort((candidates, -total_weight[candidates], -placed_weight[candidates]))
+        register = candidates[keys[0]]
+
+        free_slots = np.flatnonzero(free)
+        slot = free_slots[np.argmin(slot_cost[free_slots, register])]
+
+        assignment[register] = slot
+        unplaced[register] = False
+        free[slot] = False
+
+        placed_weight += interactions[:, register]
+        slot_cost += np.outer(distances[:, slot], interactions[:, register])
+    return assignment
+
+def estimated_cost(interactions, anchor_interactions, distances, anchor_distances, assignment):
+    '''
+        Interaction weighted distance of an assignment, a cheap estimate of the length of its routes
+    '''
+    return (
+        (interactions * distances[np.ix_(assignment, assignment)]).sum() / 2
+        + (anchor_interactions * anchor_distances[assignment]).sum()
+    )
+
+def anneal_order(interactions, anchor_interactions, distances, anchor_distances, assignment, time_budget=1, n_iterations=None, seed=None):
+    '''
+        Simulated annealing over swaps of the slots of pairs of registers
+        Each swap is scored by the change in the estimated cost of the assignment
+        The temperature falls geometrically as the time budget, or the number of iterations, is spent
+        :: assignment : array :: Initial slot index of each register
+        :: time_budget : float :: Seconds to anneal for, None to anneal for n_iterations swaps
+        :: n_iterations : int :: Number of swaps to attempt, None to anneal until the time budget is spent
+        :: seed : int :: Seed of the swaps, a fixed seed and number of iterations gives a fixed assignment
+        Returns the lowest cost assignment found
+    '''
+    if time_budget is None and n_iterations is None:
+        raise Exception("Annealing requires a time budget or a number of iterations")
+
+    rng = np.random.default_rng(seed)
+    n_registers = len(interactions)
+    assignment = np.array(assignment, dtype=np.int64)
+
+    # Only registers with some interaction change the cost when they move
+    movable = np.flatnonzero(interactions.sum(axis=1) + anchor_interactions.sum(axis=1))
+    if len(movable) == 0:
+        return assignment
+
+    def swap_cost(register, other):
+        slot, other_slot = assignment[register], assignment[other]
+        return (
+            (interactions[register] - interactions[other])
+            @ (distances[other_slot, assignment] - distances[slot, assignment])
+            + 2 * interactions[register, other] * distances[slot, other_slot]
+            + (anchor_interactions[register] - anchor_interactions[other])
+            @ (anchor_distances[other_slot] - anchor_distances[slot])
+        )
+
+    # The initial temperature accepts a typical uphill swap with even odds
+    sample = [
+        abs(swap_cost(register, other))
+        for register, other in zip(rng.choice(movable, ANNEALING_BATCH), rng.integers(n_registers, size=ANNEALING_BATCH))
+    ]
+    initial_temperature = np.mean(sample) / np.log(2)
+    if initial_temperature == 0:
+        return assignment
+
+    cost = estimated_cost(interactions, anchor_interactions, distances, anchor_distances, assignment)
+    best_cost, best_assignment = cost, assignment.copy()
+
+    start = perf_counter()
+    iteration = 0
+    progress = 0
+    while progress < 1:
+        temperature = initial_temperature * ANNEALING_COOLING ** progress
+        registers = rng.choice(movable, ANNEALING_BATCH)
+        others = rng.integers(n_registers, size=ANNEALING_BATCH)
+        thresholds = -temperature * np.log(1 - rng.random(ANNEALING_BATCH))
+
+        for register, other, threshold in zip(registers.tolist(), others.tolist(), thresholds.tolist()):
+            if register == other:
+                continue
+            delta = swap_cost(register, other)
+            # Metropolis acceptance, exp(-delta / temperature) > uniform
+            if delta < threshold:
+                assignment[register], assignment[other] = assignment[other], assignment[register]
+                cost += delta
+                if cost < best_cost:
+                    best_cost = cost
+                    best_assignment[:] = assignment
+
+        iteration += ANNEALING_BATCH
+        if time_budget is not None:
+            progress = (perf_counter() - start) / time_budget if time_budget > 0 else 1
+        if n_iterations is not None:
+            progress = max(progress, iteration / n_iterations)
+    return best_assignment
+
+def assign_slots(mapper, registers, slots, assignment):
+    '''
+        Moves each register to its assigned slot
+    '''
+    for segment_map, _ in slots:
+        segment_map.map.clear()
+        segment_map.map_rev.clear()
+
+    for symbol, slot in zip(registers, assignment):
+        segment_map, offset = slots[slot]
+        segment_map.map[symbol] = offset
+        segment_map.map_rev[offset] = symbol
+        mapper.map[symbol] = segment_map
+
+def placement_problem(mapper):
+    '''
+        Interaction weights and distances between the movable registers, their slots, and the anchors
+        Returns the registers, their slots, and the arguments of proximity_order
+        Returns None if there are fewer than two registers to place
+    '''
+    registers, slots = register_slots(mapper)
+    if len(registers) < 2:
+        return None
+
+    proximity, lookup = mapper.dag.calculate_physical_proximity()
+    proximity = proximity + proximity.T
+
+    register_indices = [lookup[symbol] for symbol in registers]
+    coordinates = slot_coordinates(slots)
+    anchor_indices, distances_to_anchors = anchor_distances(mapper, lookup, coordinates)
+
+    distances = np.abs(coordinates[:, None, :] - coordinates[None, :, :]).sum(axis=2).astype(float)
+    return registers, slots, (
+        proximity[np.ix_(register_indices, register_indices)],
+        proximity[np.ix_(register_indices, anchor_indices)],
+        distances,
+        distances_to_anchors
+    )
+
+def proximity_placement(mapper):
+    '''
+        Permutes the registers over the slots allocated by the tree
+        Registers that interact are placed close to each other, and to the IO and externs that they use
+    '''
+    problem = placement_problem(mapper)
+    if problem is None:
+        return
+    registers, slots, costs = problem
+    assign_slots(mapper, registers, slots, proximity_order(*costs))
+
+def annealing_placement(mapper, time_budget=1, n_iterations=None, seed=None):
+    '''
+        Proximity placement refined by simulated annealing
+        Trades compile time for shorter routes, see anneal_order for the arguments
+    '''
+    problem = placement_problem(mapper)
+    if problem is None:
+        return
+    registers, slots, costs = problem
+    assignment = anneal_order(*costs, proximity_order(*costs), time_budget=time_budget, n_iterations=n_iterations, seed=seed)
+    assign_slots(mapper, registers, slots, assignment)
+
+def place_registers(mapper, placement, **placement_kwargs):
+    '''
+        Applies a placement policy to the registers of a mapper
+        Keyword arguments are passed to the policy
+    '''
+    if placement == TREE:
+        return
+    if placement == PROXIMITY:
+        proximity_placement(mapper, **placement_kwargs)
+        return
+    if placement == ANNEALING:
+        annealing_placement(mapper, **placement_kwargs)
+        return
+    raise Exception(f"Unknown placement policy {placement}, expected one of {PLACEMENT_POLICIES}")
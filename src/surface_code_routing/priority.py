@@ -0,0 +1,51 @@
+'''
+    Priority
+    Policies for ordering gates that are waiting to be scheduled
+'''
+from surface_code_routing.bind import Bind
+
+FIFO = 'fifo'
+CRITICAL_PATH = 'critical_path'
+LEAST_SLACK = 'least_slack'
+
+PRIORITY_POLICIES = (FIFO, CRITICAL_PATH, LEAST_SLACK)
+
+def layer_order(gates):
+    '''
+        Orders gates on their layer such that each gate follows all of its predicates
+        Gates that share a layer keep their order in the DAG
+    '''
+    return sorted(gates, key=lambda gate: gate.layer)
+
+def critical_paths(gates):
+    '''
+        Longest path in cycles from each gate to a sink of the DAG, including the gate itself
+        Returns a dict keyed on the id of each gate
+    '''
+    paths = dict()
+    for gate in reversed(layer_order(gates)):
+        paths[id(gate)] = gate.n_cycles() + max((paths[id(antecedent)] for antecedent in gate.antecedents), default=0)
+    return paths
+
+def priorities(gates, policy):
+    '''
+        Sort keys for each gate under a scheduling policy, lower keys are scheduled first
+        Ties are scheduled in the order in which the gates became ready
+        Least slack orders on the slack held by each DAG node, as DAGBind does, then on the critical path
+    '''
+    if policy == FIFO:
+        return {id(gate): 0 for gate in gates}
+    if policy == CRITICAL_PATH:
+        return {key: -path for key, path in critical_paths(gates).items()}
+    if policy == LEAST_SLACK:
+        paths = critical_paths(gates)
+        return {id(gate): (gate.slack, -paths[id(gate)]) for gate in gates}
+    raise Exception(f"Unknown priority policy {policy}, expected one of {PRIORITY_POLICIES}")
+
+def bound_node(gate):
+    '''
+        Unwraps bind objects to the underlying DAG node
+    '''
+    while isinstance(gate, Bind):
+        gate = gate.obj
+    return gate
@@ -0,0 +1,88 @@
+'''
+    Ready Queue
+    Dependency counting queue of gates whose predicates have resolved
+'''
+from heapq import heappush
+from itertools import count
+
+class ReadyQueue:
+    '''
+        Dependency counting ready queue
+        Tracks the number of unresolved predicates of each DAG node so that resolving
+        a gate only touches its antecedents rather than rescanning the waiting list
+        Queued gates are ordered on their priority, then on the order in which they became ready
+        Gates are held on a heap of (priority, sequence, gate) entries, discarded gates are removed lazily
+    '''
+    def __init__(self, gates, resolved=None, priorities=None):
+        if resolved is None:
+            resolved = set()
+
+        self.n_unresolved = dict()
+        for gate in gates:
+            self.n_unresolved[id(gate)] = sum(1 for predicate in gate.predicates if predicate not in resolved)
+
+        # Sort keys of each gate, lower keys are scheduled first
+        self.priorities = priorities
+        self.counter = count()
+
+        self.heap = []
+        # Sequence number of the live entry of each queued gate
+        self.queued = dict()
+
+    def __len__(self):
+        return len(self.queued)
+
+    def __iter__(self):
+        '''
+            Yields queued gates in order
+            A sorted list is also a heap, so the heap is purged and sorted in place
+        '''
+        queued = self.queued
+        self.heap = [entry for entry in self.heap if queued.get(id(entry[2].obj)) == entry[1]]
+        self.heap.sort()
+        return iter([gate for _, _, gate in self.heap])
+
+    def __contains__(self, gate):
+        return id(gate.obj) in self.queued
+
+    def __repr__(self):
+        return f"ReadyQueue: {list(self)}"
+
+    def push(self, gate):
+        '''
+            Queues a bound gate, gates may only be queued once
+        '''
+        if id(gate.obj) in self.queued:
+            return False
+
+        sequence = next(self.counter)
+        self.queued[id(gate.obj)] = sequence
+        priority = 0 if self.priorities is None else self.priorities[id(gate.obj)]
+        heappush(self.heap, (priority, sequence, gate))
+        return True
+
+    def discard(self, gates):
+        '''
+            Removes bound gates from the queue
+            Their heap entries are skipped until the heap is next purged
+        '''
+        for gate in gates:
+            self.queued.pop(id(gate.obj), None)
+
+    def remaining(self, dag_node):
+        '''
+            Number of unresolved predicates of a DAG node
+        '''
+        return self.n_unresolved[id(dag_node)]
+
+    def resolve(self, dag_node):
+        '''
+            Marks a DAG node as resolved
+            Returns the antecedents for which this was the final unresolved predicate
+        '''
+        released = []
+        for antecedent in dag_node.antecedents:
+            self.n_unresolved[id(antecedent)] -= 1
+            if self.n_unresolved[id(antecedent)] == 0:
+                released.append(antecedent)
+        return released
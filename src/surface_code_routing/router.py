@@ -5,11 +5,13 @@
 
 from typing import *
 from queue import PriorityQueue
+from heapq import heappush, heappop
+from itertools import count
 from surface_code_routing.utils import debug_print
 
 from surface_code_routing.qcb import Segment, SCPatch, QCB
 from surface_code_routing.circuit_model import PatchGraph, PatchGraphNode
-from surface_code_routing.dag import DAG, DAGNode
+from surface_code_routing.dag import DAG, DAGNode, dag_order
 from surface_code_routing.mapper import QCBMapper
 from surface_code_routing.bind import RouteBind, AddrBind
 from surface_code_routing.symbol import ExternSymbol
@@ -19,6 +21,9 @@ from surface_code_routing.tikz_utils import tikz_router
 from surface_code_routing.instructions import RESET_SYMBOL, ROTATION_SYMBOL, HADAMARD_SYMBOL, Rotation, IDLE_SYMBOL
 
 from surface_code_routing.inject_teleportation_routes import TeleportInjector
+from surface_code_routing.timeline import Timeline
+from surface_code_routing.ready_queue import ReadyQueue
+from surface_code_routing.priority import priorities
 
 from surface_code_routing.constants import COULD_NOT_ALLOCATE, COULD_NOT_ROUTE
 
@@ -27,10 +32,21 @@ class QCBRouter:
         Routing object
         Attempts to route the DAG given a QCB layout
     '''
+    # Negotiated congestion costs
+    NEGOTIATION_HISTORY_COST = 1
+    NEGOTIATION_PRESENT_COST = 0.5
 
-    def __init__(self, qcb:QCB, dag:DAG, mapper:QCBMapper, graph=None, auto_route=True, verbose=False, teleport=True):
+    # Quiet stretches longer than this are fast forwarded rather than stepped
+    FAST_FORWARD_THRESHOLD = 3
+
+    def __init__(self, qcb:QCB, dag:DAG, mapper:QCBMapper, graph=None, auto_route=True, verbose=False, teleport=True, event_driven=False, priority=None, negotiated_routing=False, negotiation_rounds=8, reservation_routing=False):
         '''
             Initialise the router
+            :: event_driven : bool :: Advance directly between gate completion events rather than stepping each cycle
+            :: priority : str :: Scheduling policy for ready gates, one of PRIORITY_POLICIES, by default gates are scheduled in the order they became ready
+            :: negotiated_routing : bool :: Plan the routes of all ready non-local gates together before allocating them
+            :: negotiation_rounds : int :: Maximum number of rip-up and reroute rounds when negotiating routes
+            :: reservation_routing : bool :: Gates that cannot be routed reserve the earliest route that will become free
         '''
         if graph is None:
             graph = PatchGraph(shape=(qcb.height, qcb.width), mapper=mapper, environment=self)
@@ -45,7 +61,8 @@ class QCBRouter:
 
         self.verbose = verbose
         self.routes = dict()
-        self.active_gates = set()
+        # Insertion ordered so that active gates are stepped in the order they were activated
+        self.active_gates = dict()
 
         self.anc: dict[Any, ANC] = {}
         self.resolved: set[DAGNode] = set()
@@ -55,7 +72,24 @@ class QCBRouter:
         else:
             self.teleport_injector = None
 
-        self.layers = []
+        self.priority = priority
+
+        # Negotiated congestion routing
+        self.negotiated_routing = negotiated_routing
+        self.negotiation_rounds = negotiation_rounds
+        self.plans = dict()
+
+        # Reservation routing, start cycle and route reserved by each waiting gate
+        self.reservation_routing = reservation_routing
+        self.reservations = dict()
+
+        # Event driven routing
+        self.event_driven = event_driven
+        self.event_counter = count()
+        self.completion_queue = []
+        self.n_ticks = 0
+
+        self.layers = Timeline()
         self.delays = dict()
         self.space_time_volume = 0  # Space-time volume costing
         if auto_route:
@@ -69,200 +103,51 @@ class QCBRouter:
         '''
             Attempts to route all gates in the DAG
         '''
-        self.active_gates = set()
-        # Non-factory gates in the first layer are queued
-        waiting = list(map(lambda x: RouteBind(x, None), filter(lambda x: not x.is_factory(), self.dag.layers[0])))
+        self.active_gates = dict()
+        self.completion_queue = []
+        self.n_ticks = 0
+
         resolved = self.resolved
 
+        # Gates that resolve on the same cycle release their antecedents in this order
+        self.resolution_order = dag_order(self.dag.gates)
+
+        # Non-factory gates in the first layer are queued
+        gate_priorities = None if self.priority is None else priorities(self.dag.gates, self.priority)
+        self.ready = ReadyQueue(self.dag.gates, resolved, priorities=gate_priorities)
+        for gate in self.dag.layers[0]:
+            if not gate.is_factory():
+                self.ready.push(RouteBind(gate, None))
+
         quash_flag = 0
         # Externs are not released to the allocator until all gates are ready
-        barrier = dict()
+        self.build_barriers()
 
-        while len(waiting) > 0 or len(self.active_gates) > 0:
+        while len(self.ready) > 0 or len(self.active_gates) > 0:
             curr_layer = len(self.layers)
             self.layers.append(list())
 
-            fastforward = float('inf') 
-        
             recently_resolved = list()
             if len(self.active_gates) > 0:
-                for gate in self.active_gates:
-                    update = gate.cycle()
-                    fastforward = min(fastforward, update)
-                    if gate.resolved():
-                        recently_resolved.append(gate)
-
-                    # Release an extern allocation
-                    if gate.get_symbol() == RESET_SYMBOL:
-                        self.mapper.free(gate)
-                        
-                    self.layers[-1].append(gate)
+                if self.event_driven:
+                    # Jump directly to the next cycle on which a gate resolves
+                    curr_layer = self.skip_quiet_cycles()
+
+                recently_resolved, fastforward = self.cycle_active_gates()
 
                 if len(recently_resolved) == 0:
                     # No gates resolved, state of the system does not change, fastforward
-                    if fastforward > 3:
-                        fastforward -= 1
-                        self.space_time_volume += self.graph.space_time_volume() * fastforward 
-                        for gate in self.active_gates: 
-                            gate.cycle(step=fastforward)
-
-                        for _ in range(fastforward):
-                            # Copies of the last layer
-                            # This is required otherwise later teleported operations and other feed-back mechanisms will fail  
-                            self.layers.append([i for i in self.layers[-1]])
- 
-                    else: # Trivial fast-forwarding
-                        self.space_time_volume += self.graph.space_time_volume()
+                    self.fast_forward(fastforward)
                     continue
 
-            self.active_gates = set(filter(lambda x: not x.resolved(), self.active_gates))
+            self.active_gates = {gate: None for gate in self.active_gates if not gate.resolved()}
             for gate in recently_resolved:
-                resolved.add(gate)
-                if gate.rotates():
-                    self.rotate(gate, self.mapper[gate])
-                # Should only trigger when the final antecedent is resolved
-
-                for antecedent in gate.antecedents():
-                    all_resolved = True
-
-                    for predicate_factory in antecedent.predicate_factories:
-                        # Yet to be allocated
-                        if predicate_factory not in resolved and predicate_factory not in self.active_gates:
-                            if all(obj in resolved for obj in predicate_factory.predicates):
-                                waiting.append(RouteBind(predicate_factory, None))
-                            
-                            all_resolved = False
-                    if all_resolved is False:
-                          continue
-
-                    # Check if predicates have been resolved
-                    for predicate in antecedent.predicates:
-                        if RouteBind(predicate, None) not in resolved:
-                            all_resolved = False
-                            break
-                    if all_resolved:
-                        waiting.append(RouteBind(antecedent, None))
-
-            waiting.sort()
-            waiting_clear = list()
-
-            # Initially active gates
-            for gate in waiting:
-                # Externs
-                # Here we're first going to discover the extern gate, then backtrack and find all non-extern dependencies, and see if they've been resolved.
-                if len(extern_ante := [i for i in gate.scope if i.is_extern() and not i.is_factory()]) > 0:
-                    # Assume the barrier is resolved
-                    barrier_resolved = True
-
-                    for ext_symbol in extern_ante:
-                        if not barrier_resolved:
-                            continue
-
-                        # No barrier for this symbol, create one
-                        if ext_symbol not in barrier:
-                            barrier[ext_symbol] = tuple()
-
-                            extern_gate = None
-                            # Search over extern gate keys
-                            # Should replace this with a symbol lookup
-                            for i in self.dag.gates:
-                                if i.is_extern() and ext_symbol in i.scope:
-                                    extern_gate = i
-                                    break
-                            if extern_gate is None:
-                                raise Exception("Missing Extern Gate")
-
-                            non_extern_predicates = []
-                            extern_predicates = [extern_gate]
-
-                            # BFS to find non-extern gates
-                            while len(extern_predicates) > 0:
-                                next_extern_predicates = []
-                                for extern_pred in extern_predicates:
-                                    for pred in extern_pred.predicates:
-                                        if ext_symbol in pred.scope:
-                                            next_extern_predicates.append(pred)
-                                        else:
-                                            non_extern_predicates.append(pred)
-                                extern_predicates = next_extern_predicates
-                            non_extern_predicates = list(map(lambda x: RouteBind(x, None), non_extern_predicates))
-                            barrier[ext_symbol] = non_extern_predicates
-
-                        # Barrier already resolved
-                        if len(barrier[ext_symbol]) == 0:
-                            continue
-
-                        # Complexity of the barrier scales with O(number of IO in elements)
-                        # If the barrier is a tuple, this skips
-                        for barrier_gate in barrier[ext_symbol]: # TODO remove elements from the barrier as they are resolved
-                            if barrier_gate not in resolved:
-                                barrier_resolved = False
-                                break
-
-                        if barrier_resolved: # Once the barrier has been resolved all gates are released
-                            barrier[ext_symbol] = tuple()
-
-                        else:
-                            barrier_resolved = False
-                            continue
-
-                    if not barrier_resolved:
-                        # Gate caught on barrier, try next gate
-                        continue
-
-                # The mapper will also check if it can do an extern allocation
-                # The mapper is constrained that if the next call to the mapper is a lock on the same gate that those same addresses should be locked
-
-                addresses = self.mapper[gate]
-
-                # Could not obtain addresses for an extern
-                if addresses is COULD_NOT_ALLOCATE:
-                    self.track_delay(gate.get_symbol())
-                    continue
-
-                # Check that all addresses are free
-                if not all(self.probe_address(gate, address) for address in addresses):
-                    # Not all addresses are currently free, keep waiting
-                    # Track the delayed extern 
-                    self.track_delay(gate.get_symbol())
-                    continue
+                self.graph.deactivate(gate)
+            self.resolve_gates(recently_resolved)
 
-                # Attempt to route between the gates
-                route_exists = True
-                if gate.non_local() or gate.n_ancillae() > 0:
-                    route_exists, route_addresses = self.find_route(gate, addresses)
-                    addresses = route_addresses
-                    if route_exists and curr_layer > 0 and self.teleport_injector is not None:
-                        self.teleport_injector(gate, addresses, curr_layer)
-                else:
-                    addresses = tuple(map(self.graph.__getitem__, addresses))
-
-                # Route exists, all nodes are free
-                if route_exists:
-                    self.routes[AddrBind(gate)] = addresses
-                    self.active_gates.add(gate)
-
-                    # Rollback factories
-                    if gate.is_factory():
-                        first_free_cycle = self.mapper.first_free_cycle(gate)
-                        gate.cycles_completed = min(gate.n_cycles(), curr_layer - first_free_cycle - 1)
-                        alap = curr_layer - gate.cycles_completed - 1
-
-                        # Already scheduled on current layer
-                        if gate.cycles_completed > 0:
-                            for i in range(alap, curr_layer):
-                                self.layers[i].append(gate)
-
-                    for patch in addresses:
-                        # This patch will be locked for this duration
-                        # Storing this information in advance helps with ALAP vs ASAP scheduling
-                        patch.last_used = curr_layer + gate.n_cycles() - gate.cycles_completed
-                # Route does not exist
-                else:
-                    self.track_delay(COULD_NOT_ROUTE)
-
-            # Update the waiting list
-            waiting = list(filter(lambda x: x not in self.active_gates and x not in resolved and x not in waiting_clear, waiting))
+            # Allocated gates leave the ready queue
+            allocated = self.schedule_gates(curr_layer)
+            self.ready.discard(allocated)
 
             # Not the most elegant approach, could reorder some things
             # This should never be triggered, but exists as an exit condition
@@ -284,15 +169,385 @@ class QCBRouter:
         assert (len(resolved) == len(self.dag.gates))
         return
 
+    def cycle_active_gates(self):
+        '''
+            Steps all active gates by a single cycle
+            Returns the gates that resolved on this cycle and the
+            smallest number of cycles remaining on any active gate
+        '''
+        self.n_ticks += 1
+        fastforward = float('inf') 
+        recently_resolved = list()
+        for gate in self.active_gates:
+            update = gate.cycle()
+            fastforward = min(fastforward, update)
+            if gate.resolved():
+                recently_resolved.append(gate)
+
+            # Release an extern allocation
+            if gate.get_symbol() == RESET_SYMBOL:
+                self.mapper.free(gate)
+                
+            self.layers.add(gate, len(self.layers) - 1)
+
+        # Discard completion events that have now been processed
+        while len(self.completion_queue) > 0 and self.completion_queue[0][0] <= self.n_ticks:
+            heappop(self.completion_queue)
+
+        return recently_resolved, fastforward
+
+    def fast_forward(self, fastforward):
+        '''
+            Cycle stepping fast forward over cycles where no gate resolves
+        '''
+        if fastforward > self.FAST_FORWARD_THRESHOLD:
+            self.space_time_volume += self.quiet_cycle_volume(fastforward)
+            fastforward -= 1
+            self.n_ticks += fastforward
+            for gate in self.active_gates: 
+                gate.cycle(step=fastforward)
+
+            # Copies of the last layer
+            # This is required otherwise later teleported operations and other feed-back mechanisms will fail  
+            self.layers.repeat(fastforward)
+ 
+        else: # Trivial fast-forwarding
+            self.space_time_volume += self.quiet_cycle_volume(1)
+
+    def quiet_cycle_volume(self, n_quiet):
+        '''
+            Space time volume charged for a stretch of quiet cycles
+            A stretch longer than FAST_FORWARD_THRESHOLD is fast forwarded from its first cycle,
+            which is stepped and not charged, shorter stretches charge every cycle
+        '''
+        volume = self.graph.space_time_volume()
+        if n_quiet > self.FAST_FORWARD_THRESHOLD:
+            return volume * (n_quiet - 1)
+        return volume * n_quiet
+
+    def skip_quiet_cycles(self):
+        '''
+            Event driven fast forward
+            Consumes all cycles before the next completion event in a single step
+            Layers and space time volume match those of the cycle stepping router
+            Returns the index of the layer on which the next gate resolves 
+        '''
+        # Each active gate queues its completion when it is activated
+        assert len(self.completion_queue) > 0, "Active gates without a completion event"
+
+        n_quiet = self.completion_queue[0][0] - self.n_ticks - 1
+        if n_quiet <= 0:
+            return len(self.layers) - 1
+
+        self.n_ticks += n_quiet
+        for gate in self.active_gates:
+            gate.cycle(step=n_quiet)
+            self.layers.add(gate, len(self.layers) - 1)
+
+        self.space_time_volume += self.quiet_cycle_volume(n_quiet)
+        self.layers.repeat(n_quiet - 1)
+
+        self.layers.append(list())
+        return len(self.layers) - 1
+
+    def activate_gate(self, gate):
+        '''
+            Marks a gate as active, event driven routing additionally
+            queues the cycle on which the gate will resolve
+        '''
+        if gate not in self.active_gates:
+            self.graph.activate(gate)
+        self.active_gates[gate] = None
+        if self.event_driven:
+            remaining = max(gate.n_cycles() - gate.cycles_completed, 1)
+            heappush(self.completion_queue, (self.n_ticks + remaining, next(self.event_counter), gate))
+
+    def resolve_gates(self, recently_resolved):
+        '''
+            Marks gates as resolved and releases their antecedents to the ready queue
+        '''
+        resolved = self.resolved
+        ready = self.ready
+        for gate in sorted(recently_resolved, key=self.resolution_order):
+            first_resolution = gate not in resolved
+            if first_resolution:
+                for key in self.barrier_members.get(id(gate.obj), tuple()):
+                    self.barriers[key] -= 1
+            resolved.add(gate)
+            if gate.rotates():
+                self.rotate(gate, self.mapper[gate])
+
+            if not first_resolution:
+                continue
+            ready.resolve(gate.obj)
+
+            for antecedent in sorted(gate.antecedents(), key=self.resolution_order):
+                # Should only trigger when the final predicate is resolved
+                all_resolved = ready.remaining(antecedent) == 0
+
+                for predicate_factory in sorted(antecedent.predicate_factories, key=self.resolution_order):
+                    # Yet to be allocated
+                    if predicate_factory not in resolved and predicate_factory not in self.active_gates:
+                        if ready.remaining(predicate_factory) == 0:
+                            ready.push(RouteBind(predicate_factory, None))
+                        all_resolved = False
+
+                if all_resolved:
+                    ready.push(RouteBind(antecedent, None))
+
+    def schedule_gates(self, curr_layer):
+        '''
+            Attempts to allocate each ready gate on the current layer
+            Returns the gates that were allocated
+        '''
+        self.graph.current_cycle = curr_layer
+        if self.negotiated_routing:
+            self.negotiate_routes()
+
+        allocated = []
+        for gate in self.ready:
+            # Externs
+            # Here we're first going to discover the extern gate, then backtrack and find all non-extern dependencies, and see if they've been resolved.
+            if not self.barrier_resolved(gate):
+                # Gate caught on barrier, try next gate
+                continue
+            # The gate's own plan no longer counts against its route
+            self.release_plan(gate)
+            if self.allocate_gate(gate, curr_layer):
+                allocated.append(gate)
+
+        if self.negotiated_routing:
+            self.graph.clear_congestion()
+        return allocated
+
+    def negotiate_routes(self):
+        '''
+            Plans routes for all ready non-local gates together using negotiated congestion
+            Each round rips up and reroutes every planned route, routing patches claimed by
+            several plans accumulate a history cost that pushes later rounds onto other patches
+            The final plans stay on the graph so that each gate is routed around the plans of the gates after it
+        '''
+        self.plans = dict()
+        candidates = [gate for gate in self.ready if self.plannable(gate)]
+        if len(candidates) < 2:
+            return
+
+        graph = self.graph
+        graph.congestion = True
+        for negotiation_round in range(self.negotiation_rounds):
+            graph.congestion_factor = self.NEGOTIATION_PRESENT_COST * (negotiation_round + 1)
+            for gate in candidates:
+                self.release_plan(gate)
+                route_exists, paths = self.find_route(gate, self.mapper[gate], lock=False)
+                if route_exists:
+                    self.plans[id(gate.obj)] = paths
+                    graph.occupy(paths)
+
+            contested = graph.contested()
+            if not contested.any():
+                break
+            graph.route_history[contested] += self.NEGOTIATION_HISTORY_COST
+
+    def plannable(self, gate):
+        '''
+            Checks if a ready gate may take part in route negotiation
+            Gates using externs are excluded as obtaining their addresses triggers an allocation
+        '''
+        if not gate.non_local() or not self.barrier_resolved(gate):
+            return False
+        if any(symbol.is_extern() for symbol in gate.scope):
+            return False
+        return all(self.probe_address(gate, address) for address in self.mapper[gate])
+
+    def release_plan(self, gate):
+        '''
+            Removes the planned route of a gate from the congestion counts
+        '''
+        paths = self.plans.pop(id(gate.obj), None)
+        if paths is not None:
+            self.graph.occupy(paths, n_routes=-1)
+
+    def extern_keys(self, dag_node):
+        '''
+            Keys of the extern symbols in the scope of a DAG node
+            Extern symbols compare on the identity of their predicate
+        '''
+        keys = self.extern_key_cache.get(id(dag_node))
+        if keys is None:
+            keys = tuple(id(symbol.predicate) for symbol in dag_node.scope if isinstance(symbol, ExternSymbol))
+            self.extern_key_cache[id(dag_node)] = keys
+        return keys
+
+    def build_barriers(self):
+        '''
+            Indexes extern gates by symbol and precomputes the barrier for each extern
+            A barrier tracks the number of outstanding non-extern predicates of the extern gate
+        '''
+        self.extern_key_cache = dict()
+        self.gate_barrier_cache = dict()
+
+        # First extern gate in the DAG for each extern symbol
+        self.extern_gates = dict()
+        for gate in self.dag.gates:
+            if gate.is_extern():
+                for key in self.extern_keys(gate):
+                    self.extern_gates.setdefault(key, gate)
+
+        self.barriers = dict()
+        self.barrier_members = dict()
+        for key, extern_gate in self.extern_gates.items():
+            non_extern_predicates = dict()
+            extern_predicates = [extern_gate]
+            visited = set()
+
+            # BFS to find non-extern gates
+            while len(extern_predicates) > 0:
+                next_extern_predicates = []
+                for extern_pred in extern_predicates:
+                    for pred in extern_pred.predicates:
+                        if key in self.extern_keys(pred):
+                            if id(pred) not in visited:
+                                visited.add(id(pred))
+                                next_extern_predicates.append(pred)
+                        elif RouteBind(pred, None) not in self.resolved:
+                            non_extern_predicates[id(pred)] = pred
+                extern_predicates = next_extern_predicates
+
+            self.barriers[key] = len(non_extern_predicates)
+            for member in non_extern_predicates:
+                self.barrier_members.setdefault(member, list()).append(key)
+
+    def barrier_resolved(self, gate):
+        '''
+            Checks if all non-extern predicates of any extern used by this gate have resolved
+        '''
+        keys = self.gate_barrier_cache.get(id(gate.obj))
+        if keys is None:
+            keys = tuple(id(i.predicate) for i in gate.scope if i.is_extern() and not i.is_factory())
+            self.gate_barrier_cache[id(gate.obj)] = keys
+
+        for key in keys:
+            if key not in self.barriers:
+                raise Exception("Missing Extern Gate")
+            if self.barriers[key] > 0:
+                return False
+        return True
+
+    def allocate_gate(self, gate, curr_layer):
+        '''
+            Attempts to obtain addresses and a route for a gate
+            On success the gate is activated 
+        '''
+        # The mapper will also check if it can do an extern allocation
+        # The mapper is constrained that if the next call to the mapper is a lock on the same gate that those same addresses should be locked
+
+        addresses = self.mapper[gate]
+
+        # Could not obtain addresses for an extern
+        if addresses is COULD_NOT_ALLOCATE:
+            self.track_delay(gate.get_symbol())
+            return False
+
+        # Check that all addresses are free
+        if not all(self.probe_address(gate, address) for address in addresses):
+            # Not all addresses are currently free, keep waiting
+            # Track the delayed extern 
+            self.track_delay(gate.get_symbol())
+            return False
+
+        # Gate holds a reservation that has not yet started
+        reservation = self.reservations.get(id(gate.obj))
+        if reservation is not None and reservation[0] > curr_layer:
+            self.track_delay(COULD_NOT_ROUTE)
+            return False
+
+        # Attempt to route between the gates
+        route_exists = True
+        if gate.non_local() or gate.n_ancillae() > 0:
+            if reservation is not None:
+                route_exists, route_addresses = self.claim_reservation(gate, addresses)
+            else:
+                route_exists, route_addresses = self.find_route(gate, addresses)
+            if not route_exists and self.reservation_routing:
+                self.reserve_route(gate, curr_layer)
+            addresses = route_addresses
+            if route_exists and curr_layer > 0 and self.teleport_injector is not None:
+                self.teleport_injector(gate, addresses, curr_layer)
+        else:
+            addresses = tuple(map(self.graph.__getitem__, addresses))
+
+        # Route does not exist
+        if not route_exists:
+            self.track_delay(COULD_NOT_ROUTE)
+            return False
+
+        # Route exists, all nodes are free
+        self.routes[AddrBind(gate)] = addresses
+
+        # Rollback factories
+        if gate.is_factory():
+            first_free_cycle = self.mapper.first_free_cycle(gate)
+            gate.cycles_completed = min(gate.n_cycles(), curr_layer - first_free_cycle - 1)
+            alap = curr_layer - gate.cycles_completed - 1
+
+            # Already scheduled on current layer
+            if gate.cycles_completed > 0:
+                self.layers.add_span(gate, alap, curr_layer)
+
+        self.activate_gate(gate)
+
+        for patch in addresses:
+            # This patch will be locked for this duration
+            # Storing this information in advance helps with ALAP vs ASAP scheduling
+            patch.last_used = curr_layer + gate.n_cycles() - gate.cycles_completed
+        return True
+
+    def reserve_route(self, gate, curr_layer):
+        '''
+            Reserves the earliest route that will become free for a gate that could not be routed
+            Only gates with a single route between two registers and no ancillae reserve routes
+        '''
+        if gate.n_ancillae() > 0 or any(symbol.is_extern() for symbol in gate.scope):
+            return False
+
+        endpoints = list(self.mapper.dag_node_to_symbol_map(gate))
+        if len(endpoints) != 2:
+            return False
+        (start_symbol, start_address), (end_symbol, end_address) = endpoints
+
+        orientations = [PatchGraphNode.Z_ORIENTED, PatchGraphNode.X_ORIENTED]
+        start_orientation = orientations[start_symbol in gate.get_symbol().x]
+        reservation = self.graph.reservation_route(self.graph[start_address], self.graph[end_address], gate, start_orientation=start_orientation)
+        if reservation is PatchGraph.NO_PATH_FOUND or reservation[0] <= curr_layer:
+            return False
+
+        start_cycle, path = reservation
+        self.graph.reserve(path, gate, start_cycle)
+        self.reservations[id(gate.obj)] = reservation
+        return True
+
+    def claim_reservation(self, gate, addresses):
+        '''
+            Locks the reserved route of a gate
+            Falls back to a new route if the reserved route is not yet free
+        '''
+        _, path = self.reservations.pop(id(gate.obj))
+        self.graph.release_reservation(gate)
+        if all(patch.probe(gate) for patch in path):
+            consume(map(lambda x: x.lock(gate), path))
+            return True, path
+        return self.find_route(gate, addresses)
+
     def probe_address(self, dag_node, address):
         '''
             Dispatch method for probing an address on the graph
         '''
         return self.graph[address].probe(dag_node)
 
-    def find_route(self, gate, addresses):
+    def find_route(self, gate, addresses, lock=True):
         '''
             Attempts to find a route for a gate given a set of addresses
+            :: lock : bool :: Lock the route for the gate, otherwise the route is only planned
         '''
         paths = []
         graph_nodes = map(lambda address: self.graph[address], addresses)
@@ -335,7 +590,8 @@ class QCBRouter:
                 return False, PatchGraph.NO_PATH_FOUND
 
         # Apply locks
-        consume(map(lambda x: x.lock(gate), paths))
+        if lock:
+            consume(map(lambda x: x.lock(gate), paths))
         return True, paths
 
     def add_ancillae(self, gate, graph_node):
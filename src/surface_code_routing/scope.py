@@ -1,7 +1,16 @@
 class Scope():
+    # Number of shared layers allowed beyond the logarithm of the size of the scope before adjacent layers are merged
+    MAX_LAYERS = 8
+    # Merged scopes with at least this many entries are shared as layers rather than copied
+    SHARE_THRESHOLD = 32
+
     def __init__(self, *outer):
 
+        # Frozen mappings shared with the scopes this one was extended from, innermost last
+        self.layers = ()
         self.mapping = {}
+        # Flattened view of the layers and the mapping, kept until the layers change
+        self.flat = None
 
         if len(outer) == 0:
             outer = {}
@@ -13,25 +22,36 @@ class Scope():
             if isinstance(element, dict):
                 self |= element
             elif isinstance(element, Scope):
-                self |= element.mapping
+                self |= element.flatten()
             elif isinstance(element, Symbol):
                 if element not in self:
                     self[element] = None
             else:
                 self |= {i:None for i in element}
         self.mapping = {symbol_resolve(i):symbol_resolve(j) for i, j in self.mapping.items()}
+        self.flat = None
 
     def __getitem__(self, index):
-        return self.mapping[index]
+        try:
+            return self.mapping[index]
+        except KeyError:
+            if self.flat is not None:
+                return self.flat[index]
+            for layer in reversed(self.layers):
+                if index in layer:
+                    return layer[index]
+            raise
 
     def __setitem__(self, index, item):
         self.mapping[index] = item
+        if self.flat is not None:
+            self.flat[index] = item
 
     def __iter__(self):
-        return self.mapping.__iter__()
+        return self.flatten().__iter__()
 
     def __repr__(self):
-        return self.mapping.__repr__()
+        return self.flatten().__repr__()
 
     def __str__(self):
         return self.__repr__()
@@ -40,18 +60,76 @@ class Scope():
         return symbol_resolve(index) 
 
     def __len__(self):
-        return len(self.mapping)
+        return len(self.flatten())
+
+    def flatten(self):
+        '''
+            Single mapping of this scope and all of its layers
+            The mapping is cached until the layers of the scope change, writes to the scope are applied to it
+        '''
+        if len(self.layers) == 0:
+            return self.mapping
+        if self.flat is None:
+            flat = {}
+            for layer in self.layers:
+                flat |= layer
+            flat |= self.mapping
+            self.flat = flat
+        return self.flat
+
+    def set_layers(self, layers):
+        '''
+            Replaces the shared layers of this scope
+            Adjacent layers are merged, smallest first, once there are more than MAX_LAYERS plus the logarithm of the size of the scope
+            Each entry is copied into a logarithmic number of merged layers
+        '''
+        layers = list(layers)
+        size = sum(map(len, layers))
+        while len(layers) > self.MAX_LAYERS + size.bit_length():
+            merge = min(range(len(layers) - 1), key=lambda i: len(layers[i]) + len(layers[i + 1]))
+            layers[merge:merge + 2] = [layers[merge] | layers[merge + 1]]
+        self.layers = tuple(layers)
+        self.flat = None
+
+    def freeze(self):
+        '''
+            Moves the local mapping of this scope into a shared layer
+        '''
+        if len(self.mapping) > 0:
+            flat = self.flat
+            self.set_layers(self.layers + (self.mapping,))
+            self.mapping = {}
+            # Freezing does not change the contents of the scope
+            self.flat = flat
+        return self.layers
+
+    def extend(self):
+        '''
+            Copy-on-write child of this scope
+            The child shares the mappings of this scope rather than copying them
+            Later writes to either scope are not seen by the other
+        '''
+        scope = Scope()
+        scope.layers = self.freeze()
+        return scope
+
+    def n_entries(self):
+        '''
+            Upper bound on the number of entries in the scope, counting keys shadowed by later layers
+        '''
+        return sum(map(len, self.layers)) + len(self.mapping)
 
     def __or__(self, other:'Scope'):
-        scope = Scope(self.mapping)
-        for i in other:
-            if i in self and other[i] is not None:
-                scope[i] = other[i]
-            else:
-                scope[i] = other[i]
+        scope = self.extend()
+        scope |= other
         return scope
 
     def __ior__(self, other):
+        # Large scopes are shared as layers, entries of the other scope take precedence
+        if isinstance(other, Scope) and other.n_entries() >= self.SHARE_THRESHOLD:
+            self.set_layers(self.freeze() + other.freeze())
+            return self
+
         for i in other:
             if i in self and other[i] is not None:
                 self[i] = other[i]
@@ -60,16 +138,23 @@ class Scope():
         return self
 
     def items(self):
-        return self.mapping.items()
+        return self.flatten().items()
 
     def keys(self):
-        return self.mapping.keys()
+        return self.flatten().keys()
 
     def values(self):
-        return self.mapping.values()
+        return self.flatten().values()
 
     def __contains__(self, other):
-        return other in self.mapping
+        if other in self.mapping:
+            return True
+        if self.flat is not None:
+            return other in self.flat
+        for layer in self.layers:
+            if other in layer:
+                return True
+        return False
 
     def unrollable(self):
         return ExternSymbol(None, None) not in self.values()
@@ -88,7 +173,7 @@ class Scope():
         return True
 
     def contains(self, symbol):
-        return any(map(lambda element: element.satisfies(symbol), self.mapping))
+        return any(map(lambda element: element.satisfies(symbol), self))
 
     def exactly_satisfies(self, subscope):
         for element in subscope:
@@ -98,17 +183,20 @@ class Scope():
 
     def inject(self, scope):
         new_mapping = dict()
-        for i in self.mapping:
-            new_mapping[scope[i]] = self.mapping[i]
+        for i, j in self.items():
+            new_mapping[scope[i]] = j
+        self.layers = ()
         self.mapping = new_mapping
+        self.flat = None
 
     def clear_scope(self):
-        for i in self.mapping:
-            self.mapping[i] = None 
+        self.mapping = dict.fromkeys(self.flatten())
+        self.layers = ()
+        self.flat = None
       
     def backfill_scope(self):
-        for i in self.mapping:
-            if not i.is_extern() and self.mapping[i] is None:
-                self.mapping[i] = self.mapping[i]
+        for i, j in list(self.items()):
+            if not i.is_extern() and j is None:
+                self[i] = j
 
 from surface_code_routing.symbol import Symbol, ExternSymbol, symbol_resolve
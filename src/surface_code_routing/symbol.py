@@ -1,10 +1,28 @@
+from weakref import WeakValueDictionary
+
+# Symbols resolved from non-symbol objects, keyed on the type and value of the object
+SYMBOL_TABLE = WeakValueDictionary()
+
 def symbol_map(*args):
     return map(symbol_resolve, args)
 
 def symbol_resolve(arg):
     if isinstance(arg, Symbol):
         return arg
-    return Symbol(arg)
+    return intern_symbol(arg)
+
+def intern_symbol(arg):
+    '''
+        Resolves arg to a shared symbol
+        Equal objects resolve to the same symbol for as long as that symbol is referenced
+        Interned symbols are shared by every DAG, copy them rather than mutating them
+    '''
+    key = (type(arg), arg)
+    symbol = SYMBOL_TABLE.get(key)
+    if symbol is None:
+        symbol = Symbol(arg)
+        SYMBOL_TABLE[key] = symbol
+    return symbol
 
 class Symbol(object):
 
@@ -23,6 +41,7 @@ class Symbol(object):
             symbol = symbol.symbol
             
         self.symbol = symbol
+        self.__hash = hash(symbol)
         self.parent = parent
         self.predicate = self
         self.io_in, self.io_out = map(self.format, (io_in, io_out))
@@ -92,6 +111,8 @@ class Symbol(object):
         return self.__repr__()
 
     def __eq__(self, comparator):
+        if comparator is self:
+            return True
         if isinstance(comparator, Symbol):
             return self.symbol == comparator.symbol
         else:
@@ -101,7 +122,7 @@ class Symbol(object):
         return self.symbol == comparator.symbol
 
     def __hash__(self):
-        return hash(self.symbol)
+        return self.__hash
 
     def get_parent(self):
         if self.parent is None:
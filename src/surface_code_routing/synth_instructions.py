@@ -1,5 +1,6 @@
 from surface_code_routing.symbol import Symbol, symbol_resolve
 from surface_code_routing.scope import Scope
+from surface_code_routing.instruction_template import InstructionTemplate
 from surface_code_routing.dag import DAG
 from surface_code_routing.gate_synthesis import GateSynth
 from surface_code_routing.instructions import CNOT
@@ -53,4 +54,11 @@ def CPHASE_theta(p, q, precision=10, effort=25, seed=0, **gates):
             dag.add_gate(CNOT(ctrl, arg))
         return dag
 
-    return instruction
+    def shape(arity):
+        targs = range(1, arity)
+        yield from ((z_theta_2, (arg,), ()) for arg in range(arity))
+        yield from ((CNOT, (0, arg), ()) for arg in targs)
+        yield from ((z_theta_2_dag, (arg,), ()) for arg in targs)
+        yield from ((CNOT, (0, arg), ()) for arg in targs)
+
+    return InstructionTemplate(instruction, shape)
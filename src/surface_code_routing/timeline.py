@@ -0,0 +1,148 @@
+'''
+    Timeline
+    Run length encoded record of the gates active on each cycle
+'''
+from bisect import bisect_right
+
+class Timeline:
+    '''
+        Run length encoded record of the gates active on each cycle
+        Consecutive cycles with the same gates are stored as a single run holding one list of gates,
+        repeating the final cycle only extends its run
+        Runs are indexed on their start cycle, a cycle is found by bisecting the start cycles
+        Indexing returns a TimelineCycle that behaves like the list of gates on that cycle
+    '''
+    def __init__(self):
+        # Start cycle of each run and the gates on each cycle of that run
+        self.starts = []
+        self.runs = []
+        self.n_cycles = 0
+
+    def __len__(self):
+        return self.n_cycles
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TimelineCycle(self, cycle) for cycle in range(*index.indices(self.n_cycles))]
+        if index < 0:
+            index += self.n_cycles
+        if index < 0 or index >= self.n_cycles:
+            raise IndexError("Timeline index out of range")
+        return TimelineCycle(self, index)
+
+    def __iter__(self):
+        '''
+            Yields the list of gates on each cycle
+        '''
+        for start, end, gates in zip(self.starts, self.starts[1:] + [self.n_cycles], self.runs):
+            for _ in range(end - start):
+                yield list(gates)
+
+    def __repr__(self):
+        return f"Timeline: {self.n_cycles} cycles, {len(self.runs)} runs"
+
+    def append(self, gates):
+        '''
+            Adds a new cycle containing the gates
+        '''
+        self.starts.append(self.n_cycles)
+        self.runs.append(list(gates))
+        self.n_cycles += 1
+
+    def add(self, gate, cycle):
+        '''
+            Adds a gate to a cycle
+        '''
+        # The final cycle is usually a run of its own
+        if cycle == self.n_cycles - 1 and self.starts[-1] == cycle:
+            self.runs[-1].append(gate)
+            return
+        self.runs[self.isolate(cycle)].append(gate)
+
+    def add_span(self, gate, start, end):
+        '''
+            Adds a gate to each cycle in [start, end)
+        '''
+        if start >= end:
+            return
+        first = self.split(start)
+        last = self.split(end) if end < self.n_cycles else len(self.runs)
+        for gates in self.runs[first:last]:
+            gates.append(gate)
+
+    def repeat(self, n_repeats):
+        '''
+            Appends copies of the final cycle
+        '''
+        if n_repeats <= 0:
+            return
+        if self.n_cycles == 0:
+            self.append([])
+            n_repeats -= 1
+        self.n_cycles += n_repeats
+
+    def pop(self):
+        '''
+            Removes the final cycle
+        '''
+        self.n_cycles -= 1
+        if self.starts[-1] == self.n_cycles:
+            self.starts.pop()
+            self.runs.pop()
+
+    def cycle_gates(self, cycle):
+        '''
+            Gates active on a cycle
+        '''
+        return self.runs[self.run_index(cycle)]
+
+    def run_index(self, cycle):
+        '''
+            Index of the run containing a cycle
+        '''
+        if self.starts[-1] <= cycle:
+            return len(self.starts) - 1
+        return bisect_right(self.starts, cycle) - 1
+
+    def split(self, cycle):
+        '''
+            Splits the run containing a cycle such that a run starts on that cycle
+            Returns the index of that run
+        '''
+        index = self.run_index(cycle)
+        if self.starts[index] == cycle:
+            return index
+        self.starts.insert(index + 1, cycle)
+        self.runs.insert(index + 1, list(self.runs[index]))
+        return index + 1
+
+    def isolate(self, cycle):
+        '''
+            Splits runs such that a cycle is a run of its own
+            Returns the index of that run
+        '''
+        index = self.split(cycle)
+        if cycle + 1 < self.n_cycles:
+            self.split(cycle + 1)
+        return index
+
+
+class TimelineCycle:
+    '''
+        List-like view of the gates on a single cycle of a timeline
+    '''
+    def __init__(self, timeline, cycle):
+        self.timeline = timeline
+        self.cycle = cycle
+
+    def append(self, gate):
+        self.timeline.add(gate, self.cycle)
+
+    def __iter__(self):
+        return iter(self.timeline.cycle_gates(self.cycle))
+
+    def __len__(self):
+        return len(self.timeline.cycle_gates(self.cycle))
+
+    def __repr__(self):
+        return repr(self.timeline.cycle_gates(self.cycle))
@@ -0,0 +1,114 @@
+from surface_code_routing.dag import DAG
+from surface_code_routing.symbol import Symbol
+from surface_code_routing.instructions import INIT, CNOT, Hadamard
+from surface_code_routing.lib_instructions import T_Factory, T
+from surface_code_routing.compiled_qcb import compile_qcb
+from surface_code_routing.compact_dag import AdjacencyView, EdgeView
+from surface_code_routing.bind import RouteBind
+import unittest
+
+class CompactDAGTest(unittest.TestCase):
+    def test_views(self):
+        dag = DAG(Symbol('Test'))
+        init_a, = dag.add_gate(INIT('a'))
+        init_b, = dag.add_gate(INIT('b'))
+        cnot, = dag.add_gate(CNOT('a', 'b'))
+        hadamard, = dag.add_gate(Hadamard('a'))
+
+        predicates = set(cnot.predicates)
+        back_edges = dict(cnot.back_edges)
+        dag.compact()
+
+        assert isinstance(cnot.predicates, AdjacencyView)
+        assert isinstance(cnot.back_edges, EdgeView)
+        assert set(cnot.predicates) == predicates
+        assert dict(cnot.back_edges) == back_edges
+        assert cnot.back_edges[Symbol('a')] is init_a
+        assert init_a in cnot.predicates
+        assert RouteBind(init_a, None) in cnot.predicates
+        assert hadamard not in cnot.predicates
+        assert list(cnot.antecedents) == [hadamard]
+
+        # Views copy on the first mutation
+        cnot.antecedents.add(init_a)
+        cnot.antecedents.remove(hadamard)
+        cnot.antecedents |= {init_b}
+        assert set(cnot.antecedents) == {init_a, init_b}
+        assert list(init_a.antecedents) == [cnot]
+
+        cnot.forward_edges[Symbol('b')] = init_b
+        assert cnot.forward_edges[Symbol('b')] is init_b
+        assert cnot.forward_edges[Symbol('a')] is hadamard
+
+    def test_compact_repeated(self):
+        def add_gates(dag, start, end):
+            for i in range(start, end):
+                dag.add_gate(CNOT('abc'[i % 3], 'abc'[(i + 1) % 3]))
+                dag.add_gate(Hadamard('abc'[i % 3]))
+
+        def build_dag(compact):
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a', 'b', 'c'))
+            add_gates(dag, 0, 20)
+            if compact:
+                dag.compact()
+            add_gates(dag, 20, 40)
+            return dag
+
+        dag = build_dag(False)
+        compact = build_dag(True)
+
+        def edges(dag):
+            index = {id(gate):i for i, gate in enumerate(dag.gates)}
+            return [(
+                sorted(index[id(i)] for i in gate.predicates),
+                sorted(index[id(i)] for i in gate.antecedents),
+                {repr(i):index[id(j)] for i, j in gate.back_edges.items()},
+                {repr(i):index[id(j)] for i, j in gate.forward_edges.items()},
+                gate.layer, gate.slack
+            ) for gate in dag.gates]
+        assert edges(dag) == edges(compact)
+
+        # Gates added after compaction are compacted by the next call
+        compact.compact()
+        assert edges(dag) == edges(compact)
+        assert all(isinstance(gate.predicates, AdjacencyView) for gate in compact.gates)
+
+        # Membership is checked against the position of the gate
+        for gate in compact.gates:
+            for predicate in gate.predicates:
+                assert predicate in gate.predicates
+                assert RouteBind(predicate, None) in gate.predicates
+                assert gate in predicate.antecedents
+            assert gate not in gate.predicates
+
+    def test_compile(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a'))
+            dag.add_gate(INIT('b'))
+            dag.add_gate(T('a', factory=factory))
+            dag.add_gate(CNOT('a', 'b'))
+            dag.add_gate(T('b', factory=factory))
+            dag.add_gate(Hadamard('a'))
+            dag.add_gate(T('a', factory=factory))
+            return dag
+
+        factory = T_Factory()
+        dag = build_dag()
+        compact_dag = build_dag().compact()
+
+        for event_driven in (False, True):
+            n_cycles, layers = dag.compile(1, factory.instantiate(), event_driven=event_driven)
+            n_cycles_compact, layers_compact = compact_dag.compile(1, factory.instantiate(), event_driven=event_driven)
+            assert n_cycles == n_cycles_compact
+            def symbols(layers):
+                return [sorted(repr(gate.get_symbol()) for gate in layer) for layer in layers]
+            assert symbols(layers) == symbols(layers_compact)
+
+        qcb = compile_qcb(build_dag(), 10, 10, factory)
+        compact_qcb = compile_qcb(build_dag().compact(), 10, 10, factory)
+        assert qcb.n_cycles() == compact_qcb.n_cycles()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,11 @@ from surface_code_routing.instructions import INIT, CNOT, PREP, MEAS, X
 from surface_code_routing.lib_instructions import T, T_Factory,  Toffoli
 from surface_code_routing.symbol import Symbol, ExternSymbol
 
-from surface_code_routing.compiled_qcb import CompiledQCB, compile_qcb
+from surface_code_routing.compiled_qcb import CompiledQCB, compile_qcb, compile_qcb_annealed
+from surface_code_routing.allocator import ScoringPool
 
 import unittest
+from unittest import mock
 
 class CompilerTests(unittest.TestCase):
      
@@ -68,5 +70,87 @@ class CompilerTests(unittest.TestCase):
                 else:
                     self.test_compiled_qcb(small_qcb, large_qcb)
 
+    def test_compile_cache(self):
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT('a', 'b', 'c'))
+        dag.add_gate(T('a'))
+        dag.add_gate(T('b'))
+        dag.add_gate(CNOT('a', 'c'))
+        dag.add_gate(T('c'))
+
+        t_factory = T_Factory()
+        qcb_comp = compile_qcb(dag, 20, 20, t_factory)
+        allocator = qcb_comp.qcb.allocator
+
+        hits, misses = allocator.compile_cache_stats()
+        assert(misses >= len(allocator.compile_cache))
+        assert(hits > 0)
+
+        # Cached scores agree with a fresh compilation
+        for n_channels, n_externs in ((1, 1), (2, 2)):
+            externs = [t_factory.instantiate() for _ in range(n_externs)]
+            score = allocator.compile_score(n_channels, *externs)
+            assert(score == dag.compile(n_channels, *externs)[0])
+            assert(allocator.compile_score(n_channels, *reversed(externs)) == score)
+        assert(allocator.compile_cache_hits > hits)
+
+    def test_parallel_scoring(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a', 'b', 'c'))
+            dag.add_gate(T('a'))
+            dag.add_gate(T('b'))
+            dag.add_gate(CNOT('a', 'c'))
+            dag.add_gate(T('c'))
+            return dag
+
+        # Pools that scored configurations and the budget of each call
+        scored = []
+        score = ScoringPool.score
+        def record_score(pool, configurations, cycle_budget=None):
+            scored.append((pool, cycle_budget))
+            return score(pool, configurations, cycle_budget=cycle_budget)
+
+        t_factory = T_Factory()
+        serial = compile_qcb(build_dag(), 20, 20, t_factory).qcb.allocator
+        with mock.patch.object(ScoringPool, 'score', record_score):
+            parallel = compile_qcb(build_dag(), 20, 20, t_factory, allocator_kwargs={'n_processes':2}).qcb.allocator
+
+        # Workers are forked once and each call is bounded by the current score
+        assert(len(scored) > 1)
+        assert(len(set(id(pool) for pool, _ in scored)) == 1)
+        assert(all(cycle_budget is not None for _, cycle_budget in scored))
+        assert(parallel.pool is None)
+
+        assert(serial.n_channels == parallel.n_channels)
+        assert(len(serial.externs) == len(parallel.externs))
+        for key, score in serial.compile_cache.items():
+            assert(parallel.compile_cache[key] == score)
+
+    def test_compile_annealed(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a', 'b', 'c', 'd'))
+            dag.add_gate(T('a'))
+            dag.add_gate(CNOT('a', 'c'))
+            dag.add_gate(CNOT('b', 'd'))
+            dag.add_gate(T('d'))
+            dag.add_gate(CNOT('c', 'b'))
+            return dag
+
+        t_factory = T_Factory()
+        dags = []
+        def constructor():
+            dags.append(build_dag())
+            return dags[-1]
+
+        qcb = compile_qcb_annealed(constructor, 20, 20, t_factory, n_candidates=3, time_budget=None, n_iterations=200, seed=0)
+
+        # Each candidate is routed from its own DAG, the candidate with the least volume is kept
+        assert(len(dags) == 3)
+        assert(qcb.dag in dags)
+        assert(qcb.router.mapper.placement == 'annealing')
+        assert(len(qcb.router.resolved) == len(qcb.dag.gates))
+
 if __name__ == '__main__':
     unittest.main()
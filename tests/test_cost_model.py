@@ -0,0 +1,74 @@
+from surface_code_routing.dag import DAG
+from surface_code_routing.symbol import Symbol
+from surface_code_routing.instructions import INIT, CNOT
+from surface_code_routing.qcb import QCB
+from surface_code_routing.allocator import Allocator
+from surface_code_routing.qcb_graph import QCBGraph
+from surface_code_routing.qcb_tree import QCBTree
+from surface_code_routing.mapper import QCBMapper
+from surface_code_routing.circuit_model import PatchGraph
+from surface_code_routing.inject_rotations import RotationInjector
+from surface_code_routing.router import QCBRouter
+from surface_code_routing.compiled_qcb import compile_qcb
+from surface_code_routing.cost_model import channel_demand, register_coordinates
+import numpy as np
+import unittest
+
+class CostModelTest(unittest.TestCase):
+    def test_channel_demand(self):
+        proximity = np.array([[0, 2, 0], [2, 0, 1], [0, 1, 0]])
+        congestion = np.zeros((3, 3))
+        coordinates = {0: (0, 0), 1: (0, 3), 2: (2, 3)}
+
+        demand = channel_demand((4, 4), coordinates, proximity, congestion)
+
+        # Proximity is spread over the box between each pair of registers
+        assert np.isclose(demand.sum(), 4 + 2)
+        assert np.isclose(demand[0, 1], 1)
+        assert np.isclose(demand[1, 3], 2 / 3)
+        assert demand[3, 0] == 0
+
+        # Busy registers raise the demand on their channels
+        congestion[0, 1] = 1
+        assert channel_demand((4, 4), coordinates, proximity, congestion)[0, 1] > demand[0, 1]
+
+    def test_patch_weights(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            registers = [f'q_{i}' for i in range(6)]
+            for register in registers:
+                dag.add_gate(INIT(register))
+            for _ in range(3):
+                dag.add_gate(CNOT('q_0', 'q_5'))
+                dag.add_gate(CNOT('q_1', 'q_4'))
+                dag.add_gate(CNOT('q_2', 'q_3'))
+            return dag
+
+        dag = build_dag()
+        qcb = QCB(10, 10, dag)
+        allocator = Allocator(qcb)
+        graph = QCBGraph(qcb)
+        tree = QCBTree(graph)
+        mapper = QCBMapper(dag, tree)
+        circuit_model = PatchGraph(qcb.shape, mapper, None, congestion_weight=2)
+
+        assert len(register_coordinates(dag, mapper)) == 6
+
+        # Only routing channels are weighted, the busiest channel costs 1 + congestion_weight
+        channels = circuit_model.state_codes == PatchGraph.STATE_ROUTE
+        assert np.isclose(circuit_model.patch_weights.max(), 3)
+        assert (circuit_model.patch_weights[~channels] == 1).all()
+        assert (circuit_model.patch_weights >= 1).all()
+
+        y, x = np.unravel_index(np.argmax(circuit_model.patch_weights), qcb.shape)
+        assert circuit_model[y, x].cost() == circuit_model.patch_weights[y, x]
+
+        rot_injector = RotationInjector(dag, mapper, qcb, graph=circuit_model)
+        router = QCBRouter(qcb, dag, mapper, graph=circuit_model)
+        assert len(router.resolved) == len(dag.gates)
+
+        compiled_qcb = compile_qcb(build_dag(), 10, 10, patch_graph_kwargs={'fast_routing':True, 'congestion_weight':1})
+        assert compiled_qcb.n_cycles() > 0
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,15 @@
 from surface_code_routing.dag import DAG
 from surface_code_routing.symbol import Symbol
 
-from surface_code_routing.instructions import INIT, CNOT
+from surface_code_routing.instructions import INIT, CNOT, Hadamard, PREP, MEAS
 from surface_code_routing.lib_instructions import T, T_Factory
 from surface_code_routing.scope import Scope
+from surface_code_routing.constants import EXCEEDED_CYCLE_BUDGET
 
 
 from surface_code_routing.scope import Scope
 from surface_code_routing.symbol import Symbol, ExternSymbol
+import numpy as np
 import unittest
 
 class ScopeTest(unittest.TestCase):
@@ -101,6 +103,166 @@ class ScopeTest(unittest.TestCase):
         assert(extern_symbols[0].satisfies(t_2))
         assert(extern_symbols[0] !=  t_2)
 
-        
+    def test_compile_event_driven(self):
+        g = DAG(Symbol('tst'))
+        g.add_gate(INIT('a', 'b', 'c', 'd'))
+        g.add_gate(T('a'))
+        g.add_gate(CNOT('a', 'b'))
+        g.add_gate(T('c'))
+        g.add_gate(CNOT('c', 'd'))
+        g.add_gate(T('b'))
+        g.add_gate(CNOT('b', 'd'))
+        g.add_gate(T('a'))
+
+        factory = T_Factory()
+        for n_channels in (1, 2):
+            for n_externs in (1, 2, 3):
+                externs = [factory.instantiate() for _ in range(n_externs)]
+                n_cycles, layers = g.compile(n_channels, *externs)
+                layers = [sorted(map(repr, layer)) for layer in layers]
+
+                n_cycles_event, layers_event = g.compile(n_channels, *externs, event_driven=True)
+                layers_event = [sorted(map(repr, layer)) for layer in layers_event]
+
+                assert(n_cycles == n_cycles_event)
+                assert(layers == layers_event)
+
+    def test_compile_event_driven_random(self):
+        factory = T_Factory()
+        for seed in range(8):
+            rng = np.random.default_rng(seed)
+            qubits = [f'q_{i}' for i in range(6)]
+            g = DAG(Symbol('tst'))
+            g.add_gate(INIT(*qubits))
+            for _ in range(40):
+                choice = rng.integers(3)
+                if choice == 0:
+                    g.add_gate(T(str(rng.choice(qubits))))
+                elif choice == 1:
+                    g.add_gate(CNOT(*map(str, rng.choice(qubits, 2, replace=False))))
+                else:
+                    g.add_gate(Hadamard(str(rng.choice(qubits))))
+
+            for n_channels in (1, 3):
+                for priority in ('fifo', 'critical_path'):
+                    externs = [factory.instantiate() for _ in range(2)]
+                    n_cycles, layers = g.compile(n_channels, *externs, priority=priority)
+                    n_cycles_event, layers_event = g.compile(n_channels, *externs, event_driven=True, priority=priority)
+
+                    # Layers are compared as sets, the order within a layer is not significant
+                    assert(n_cycles == n_cycles_event)
+                    assert([sorted(map(repr, layer)) for layer in layers] == [sorted(map(repr, layer)) for layer in layers_event])
+
+    def test_compile_cycle_budget(self):
+        g = DAG(Symbol('tst'))
+        g.add_gate(INIT('a', 'b'))
+        g.add_gate(T('a'))
+        g.add_gate(CNOT('a', 'b'))
+        g.add_gate(T('b'))
+
+        factory = T_Factory()
+        n_cycles, _ = g.compile(1, factory.instantiate())
+        for event_driven in (False, True):
+            assert(g.compile(1, factory.instantiate(), cycle_budget=n_cycles, event_driven=event_driven)[0] == n_cycles)
+            assert(g.compile(1, factory.instantiate(), cycle_budget=n_cycles - 1, event_driven=event_driven)[0] is EXCEEDED_CYCLE_BUDGET)
+
+
+    def test_proximity_matrices(self):
+        def resolve_physical(dag, targ):
+            parent = targ.get_parent()
+            if parent.is_extern():
+                parent = dag.scope[parent]
+            return parent
+
+        # Reference implementations of the matrices as nested loops
+        def proximity(dag, lookup, resolve):
+            prox = np.zeros((len(lookup), len(lookup)))
+            for layer in dag.layers:
+                for gate in layer:
+                    for targ in gate.scope:
+                        for other_targ in gate.scope:
+                            if other_targ is not targ:
+                                prox[lookup[resolve(targ)], lookup[resolve(other_targ)]] += 1
+            return prox
+
+        def congestion(dag, lookup, resolve):
+            conj = np.zeros((len(lookup), len(lookup)))
+            for layer in dag.layers:
+                for gate in layer:
+                    if len(gate.scope) > 1:
+                        for other_gate in layer:
+                            if gate is not other_gate and len(other_gate.scope) > 1:
+                                for targ in gate.scope:
+                                    for other_targ in other_gate.scope:
+                                        conj[lookup[resolve(targ)], lookup[resolve(other_targ)]] += 1
+            return conj
+
+        g = DAG(Symbol('tst'))
+        for register in 'abcde':
+            g.add_gate(INIT(register))
+        g.add_gate(CNOT('a', 'b'))
+        g.add_gate(CNOT('c', 'd'))
+        g.add_gate(T('a'))
+        g.add_gate(CNOT('b', 'e'))
+        g.add_gate(CNOT('d', 'a'))
+        g.add_gate(CNOT('c', 'e'))
+        g.add_gate(T('d'))
+        g.add_gate(CNOT('e', 'a'))
+
+        factory = T_Factory()
+        g.compile(2, factory.instantiate(), factory.instantiate())
+
+        prox, lookup = g.calculate_logical_proximity()
+        assert (prox == proximity(g, lookup, lambda targ: targ)).all()
+        assert prox.sum() > 0
+
+        conj, lookup = g.calculate_logical_conjestion()
+        assert (conj == congestion(g, lookup, lambda targ: targ)).all()
+        assert conj.sum() > 0
+
+        prox, lookup = g.calculate_physical_proximity()
+        assert (prox == proximity(g, lookup, lambda targ: resolve_physical(g, targ))).all()
+
+        conj, lookup = g.calculate_physical_conjestion()
+        assert (conj == congestion(g, lookup, lambda targ: resolve_physical(g, targ))).all()
+
+    def test_instruction_templates(self):
+        def build(materialise):
+            g = DAG(Symbol('tst'))
+            g.add_gate(INIT('a', 'b', 'c', 'd'))
+            for instruction in (CNOT('a', 'b'), Hadamard('c'), PREP('a', 'd'), CNOT('c', 'b', 'd'), MEAS('a', 'b', 'c'), Hadamard('a')):
+                g.add_gate(instruction.materialise() if materialise else instruction)
+            return g
+
+        unrolled, stamped = build(True), build(False)
+        assert len(unrolled.gates) == len(stamped.gates)
+
+        def index(g):
+            return {id(gate):i for i, gate in enumerate(g.gates)}
+        unrolled_index, stamped_index = index(unrolled), index(stamped)
+
+        for unrolled_gate, stamped_gate in zip(unrolled.gates, stamped.gates):
+            assert repr(unrolled_gate) == repr(stamped_gate)
+            assert unrolled_gate.symbol.io == stamped_gate.symbol.io
+            assert unrolled_gate.layer == stamped_gate.layer
+            assert unrolled_gate.n_cycles() == stamped_gate.n_cycles()
+            assert unrolled_gate.rotates() == stamped_gate.rotates()
+            assert set(unrolled_index[id(i)] for i in unrolled_gate.predicates) == set(stamped_index[id(i)] for i in stamped_gate.predicates)
+            assert {i:unrolled_index[id(j)] for i, j in unrolled_gate.forward_edges.items()} == {i:stamped_index[id(j)] for i, j in stamped_gate.forward_edges.items()}
+
+        # Instructions that are not added to a DAG still behave as their DAG
+        cnot = CNOT('a', 'b')
+        assert cnot.symbol == Symbol('CNOT')
+        assert len(cnot.gates) == 1
+
+    def test_instruction_template_arity(self):
+        g = DAG(Symbol('tst'))
+        g.add_gate(INIT('a', 'b'))
+        with self.assertRaises(TypeError):
+            g.add_gate(Hadamard('a', 'b'))
+        with self.assertRaises(TypeError):
+            Hadamard()
+        assert len(g.add_gate(Hadamard('a'))) == 1
+
 if __name__ == '__main__':
     unittest.main()
@@ -11,6 +11,9 @@ from surface_code_routing.qcb_graph import QCBGraph
 from surface_code_routing.qcb_tree import QCBTree
 from surface_code_routing.allocator import Allocator
 from surface_code_routing.qcb import QCB, SCPatch
+from surface_code_routing.placement import placement_problem, proximity_order, anneal_order, estimated_cost
+
+import numpy as np
      
 class MapperTest(unittest.TestCase):
 
@@ -93,5 +96,95 @@ class MapperTest(unittest.TestCase):
         for gate in dag.gates:
             assert(mapper[gate])
 
+    def test_coordinate_table(self):
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT('a', 'b', 'c', 'd'))
+        dag.add_gate(CNOT('a', 'b'))
+        dag.add_gate(CNOT('c', 'd', 'a'))
+        dag.add_gate(MEAS('a', 'b', 'c', 'd'))
+
+        qcb = QCB(6, 6, dag)
+        allocator = Allocator(qcb)
+        graph = QCBGraph(qcb)
+        tree = QCBTree(graph)
+        mapper = QCBMapper(dag, tree)
+
+        for symbol in map(Symbol, 'abcd'):
+            assert(mapper.coordinates[symbol] == mapper.map[symbol][symbol])
+            assert(mapper.dag_symbol_to_coordinates(symbol) == (mapper.coordinates[symbol], None))
+
+        for gate in dag.gates:
+            coordinates = mapper[gate]
+            assert(coordinates == [mapper.map[symbol][symbol] for symbol in gate.scope])
+            assert(tuple(coordinates) == mapper.gate_coordinates[gate])
+            # Cached coordinates are returned as a new list
+            coordinates.clear()
+            assert(len(mapper[gate]) == len(gate.scope))
+
+    def test_proximity_placement(self):
+        registers = ['q_{i}'.format(i=i) for i in range(12)]
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT(*registers))
+        # Pairs of registers that are far apart in allocation order interact
+        for _ in range(4):
+            for i in range(6):
+                dag.add_gate(CNOT(registers[i], registers[i + 6]))
+
+        def interaction_distance(mapper):
+            distance = 0
+            for gate in dag.gates:
+                coordinates = mapper[gate]
+                if len(coordinates) == 2:
+                    (y_0, x_0), (y_1, x_1) = coordinates
+                    distance += abs(y_0 - y_1) + abs(x_0 - x_1)
+            return distance
+
+        mappers = dict()
+        for placement in ('tree', 'proximity'):
+            qcb = QCB(10, 10, dag)
+            allocator = Allocator(qcb)
+            tree = QCBTree(QCBGraph(qcb))
+            mappers[placement] = QCBMapper(dag, tree, placement=placement)
+
+        # Registers are permuted over the slots allocated by the tree
+        mapper = mappers['proximity']
+        assert(len(set(mapper.coordinates.values())) == len(registers))
+        for segment_map in set(mapper.map.values()):
+            assert(len(segment_map.map) == segment_map.n_slots_full)
+            assert(all(segment_map.map_rev[index] is symbol for symbol, index in segment_map.map.items()))
+
+        assert(interaction_distance(mappers['proximity']) < interaction_distance(mappers['tree']))
+
+    def test_annealing_placement(self):
+        registers = ['q_{i}'.format(i=i) for i in range(12)]
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT(*registers))
+        for i in range(12):
+            dag.add_gate(CNOT(registers[i], registers[(5 * i + 3) % 12]))
+            dag.add_gate(CNOT(registers[i], registers[(i + 1) % 12]))
+
+        qcb = QCB(10, 10, dag)
+        allocator = Allocator(qcb)
+        tree = QCBTree(QCBGraph(qcb))
+        placement_kwargs = {'time_budget':None, 'n_iterations':2000, 'seed':0}
+        mapper = QCBMapper(dag, tree, placement='annealing', placement_kwargs=placement_kwargs)
+
+        assert(len(set(mapper.coordinates.values())) == len(registers))
+        for segment_map in set(mapper.map.values()):
+            assert(len(segment_map.map) == segment_map.n_slots_full)
+            assert(all(segment_map.map_rev[index] is symbol for symbol, index in segment_map.map.items()))
+
+        # Registers are listed in the order of their slots, the annealed assignment is the identity
+        _, _, costs = placement_problem(mapper)
+        annealed = np.arange(len(registers))
+        greedy = proximity_order(*costs)
+        assert(estimated_cost(*costs, annealed) <= estimated_cost(*costs, greedy))
+
+        # Annealing from the greedy placement is reproducible with a fixed seed and number of iterations
+        refined = anneal_order(*costs, greedy, **placement_kwargs)
+        assert((refined == anneal_order(*costs, greedy, **placement_kwargs)).all())
+        assert(sorted(refined) == list(range(len(registers))))
+        assert(estimated_cost(*costs, refined) <= estimated_cost(*costs, greedy))
+
 if __name__ == '__main__':
     unittest.main()
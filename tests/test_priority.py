@@ -0,0 +1,84 @@
+from surface_code_routing.dag import DAG
+from surface_code_routing.symbol import Symbol
+from surface_code_routing.instructions import INIT, CNOT, Hadamard, ROTATION_SYMBOL
+from surface_code_routing.lib_instructions import T_Factory, T, Toffoli
+from surface_code_routing.compiled_qcb import compile_qcb
+from surface_code_routing.priority import critical_paths, priorities, layer_order, PRIORITY_POLICIES
+import numpy as np
+import unittest
+
+class PriorityTest(unittest.TestCase):
+    def test_critical_path(self):
+        dag = DAG(Symbol('Test'))
+        init_a, = dag.add_gate(INIT('a'))
+        init_b, = dag.add_gate(INIT('b'))
+        init_c, = dag.add_gate(INIT('c'))
+        hadamard_a, = dag.add_gate(Hadamard('a'))
+        cnot_ab, = dag.add_gate(CNOT('a', 'b'))
+        hadamard_c, = dag.add_gate(Hadamard('c'))
+
+        order = layer_order(dag.gates)
+        assert len(order) == len(dag.gates)
+        assert order.index(hadamard_a) < order.index(cnot_ab)
+
+        paths = critical_paths(dag.gates)
+        assert paths[id(cnot_ab)] == cnot_ab.n_cycles()
+        assert paths[id(init_a)] > paths[id(init_c)]
+
+        keys = priorities(dag.gates, 'critical_path')
+        assert keys[id(init_a)] < keys[id(init_c)]
+
+        # Least slack reads the slack held by each node
+        keys = priorities(dag.gates, 'least_slack')
+        assert keys[id(init_a)][0] == init_a.slack == 1
+        assert keys[id(hadamard_c)][0] == float('inf')
+        assert keys[id(init_a)] < keys[id(hadamard_c)]
+
+    def test_policies(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a', 'b', 'c', 'd'))
+            dag.add_gate(T('a'))
+            dag.add_gate(CNOT('a', 'b'))
+            dag.add_gate(Hadamard('c'))
+            dag.add_gate(CNOT('c', 'd'))
+            dag.add_gate(T('d'))
+            return dag
+
+        t_factory = T_Factory()
+        for policy in PRIORITY_POLICIES:
+            dag = build_dag()
+            n_cycles, _ = dag.compile(2, t_factory, priority=policy)
+            assert n_cycles == dag.compile(2, t_factory, event_driven=True, priority=policy)[0]
+
+            qcb = compile_qcb(build_dag(), 12, 12, t_factory,
+                              router_kwargs={'priority':policy},
+                              allocator_kwargs={'compile_kwargs':{'priority':policy}})
+            assert len(qcb.router.ready) == 0
+
+        with self.assertRaises(Exception):
+            priorities(build_dag().gates, 'unknown')
+
+        # Without a policy both schedulers keep their existing order and no priorities are computed
+        qcb = compile_qcb(build_dag(), 12, 12, t_factory)
+        assert qcb.router.ready.priorities is None
+
+        # Rotations injected by the router are ordered before the gate that they precede
+        rng = np.random.default_rng(1)
+        registers = [f'q_{i}' for i in range(6)]
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT(*registers))
+        for _ in range(30):
+            if rng.random() < 0.5:
+                dag.add_gate(CNOT(*rng.choice(registers, 2, replace=False).tolist()))
+            else:
+                dag.add_gate(Toffoli(*rng.choice(registers, 3, replace=False).tolist()))
+        qcb = compile_qcb(dag, 14, 14, t_factory, router_kwargs={'priority':'critical_path'})
+        assert any(gate.get_symbol() == ROTATION_SYMBOL for gate in dag.gates)
+
+        order = layer_order(dag.gates)
+        positions = {id(gate): position for position, gate in enumerate(order)}
+        assert all(positions[id(predicate)] < positions[id(gate)] for gate in order for predicate in gate.predicates)
+
+if __name__ == '__main__':
+    unittest.main()
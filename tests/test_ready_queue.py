@@ -0,0 +1,63 @@
+from surface_code_routing.dag import DAG
+from surface_code_routing.symbol import Symbol
+from surface_code_routing.instructions import INIT, CNOT
+from surface_code_routing.bind import RouteBind
+from surface_code_routing.ready_queue import ReadyQueue
+import unittest
+
+class ReadyQueueTest(unittest.TestCase):
+    def test_release(self):
+        dag = DAG(Symbol('Test'))
+        init_a, init_b = dag.add_gate(INIT('a', 'b'))
+        cnot, = dag.add_gate(CNOT('a', 'b'))
+
+        ready = ReadyQueue(dag.gates)
+        assert ready.remaining(init_a) == 0
+        assert ready.remaining(cnot) == 2
+        assert ready.resolve(init_a) == []
+        assert ready.resolve(init_b) == [cnot]
+        assert ready.remaining(cnot) == 0
+
+    def test_push(self):
+        dag = DAG(Symbol('Test'))
+        init, _ = dag.add_gate(INIT('a', 'b'))
+        cnot, = dag.add_gate(CNOT('a', 'b'))
+
+        ready = ReadyQueue(dag.gates)
+        assert ready.push(RouteBind(init, None))
+        assert ready.push(RouteBind(cnot, None))
+        # Gates are only queued once
+        assert not ready.push(RouteBind(init, None))
+        assert len(ready) == 2
+
+        ready.discard([RouteBind(init, None)])
+        assert [gate.obj for gate in ready] == [cnot]
+        assert RouteBind(cnot, None) in ready
+        assert RouteBind(init, None) not in ready
+
+        # Discarded gates may be queued again behind the gates already queued
+        assert ready.push(RouteBind(init, None))
+        assert len(ready) == 2
+        assert [gate.obj for gate in ready] == [cnot, init]
+
+    def test_priorities(self):
+        dag = DAG(Symbol('Test'))
+        gates = dag.add_gate(INIT('a', 'b', 'c', 'd'))
+        priorities = {id(gate):priority for gate, priority in zip(gates, (2, 0, 1, 0))}
+
+        ready = ReadyQueue(dag.gates, priorities=priorities)
+        for gate in gates:
+            ready.push(RouteBind(gate, None))
+
+        # Equal priorities keep the order in which they were queued
+        order = [gates[1], gates[3], gates[2], gates[0]]
+        assert [gate.obj for gate in ready] == order
+
+        ready.discard([RouteBind(gates[3], None)])
+        ready.push(RouteBind(gates[3], None))
+        ready.discard([RouteBind(gates[2], None)])
+        assert len(ready) == 3
+        assert [gate.obj for gate in ready] == [gates[1], gates[3], gates[0]]
+
+if __name__ == '__main__':
+    unittest.main()
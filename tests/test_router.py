@@ -8,14 +8,19 @@ from surface_code_routing.qcb_graph import QCBGraph
 from surface_code_routing.qcb_tree import QCBTree
 from surface_code_routing.router import QCBRouter
 from surface_code_routing.mapper import QCBMapper
-from surface_code_routing.circuit_model import PatchGraph
+from surface_code_routing.circuit_model import PatchGraph, PatchGraphNode
 from surface_code_routing.inject_rotations import RotationInjector
 
 from surface_code_routing.bind import RouteBind
 
 from surface_code_routing.lib_instructions import T_Factory, T, Toffoli
+from surface_code_routing.compiled_qcb import compile_qcb
 
+import os
+import importlib.util
+import numpy as np
 import unittest
+from unittest import mock
 
 from test_utils import QCBInterface, QCBSegmentInterface, MapperInterface, GateInterface
 
@@ -302,5 +307,381 @@ class RouterTest(unittest.TestCase):
         router = QCBRouter(qcb, dag, mapper, graph=circuit_model)
 
 
+    def test_event_driven(self):
+        def t_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a', 'b'))
+            dag.add_gate(T('a'))
+            dag.add_gate(CNOT('a', 'b'))
+            dag.add_gate(T('b'))
+            dag.add_gate(Hadamard('a'))
+            dag.add_gate(T('a'))
+            return dag
+
+        def ghz_dag():
+            dag = DAG(Symbol('GHZ'))
+            dag.add_gate(INIT(*['q_{i}'.format(i=i) for i in range(8)]))
+            dag.add_gate(Hadamard('q_0'))
+            for i in range(7):
+                dag.add_gate(CNOT('q_{i}'.format(i=i), 'q_{i}'.format(i=i + 1)))
+            return dag
+
+        for dag_fn, shape in ((t_dag, (12, 12)), (ghz_dag, (8, 8))):
+            stepped = compile_qcb(dag_fn(), *shape, T_Factory())
+            evented = compile_qcb(dag_fn(), *shape, T_Factory(), router_kwargs={'event_driven':True})
+            assert router_signature(stepped.router) == router_signature(evented.router)
+
+    def test_event_driven_fast_forward_threshold(self):
+        # Both routers read the same fast forward rule
+        def t_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a', 'b'))
+            dag.add_gate(T('a'))
+            dag.add_gate(CNOT('a', 'b'))
+            dag.add_gate(T('b'))
+            dag.add_gate(Hadamard('a'))
+            dag.add_gate(T('a'))
+            return dag
+
+        threshold = QCBRouter.FAST_FORWARD_THRESHOLD
+        try:
+            for QCBRouter.FAST_FORWARD_THRESHOLD in (0, 1, 3, 8):
+                stepped = compile_qcb(t_dag(), 12, 12, T_Factory())
+                evented = compile_qcb(t_dag(), 12, 12, T_Factory(), router_kwargs={'event_driven':True})
+                assert router_signature(stepped.router) == router_signature(evented.router)
+        finally:
+            QCBRouter.FAST_FORWARD_THRESHOLD = threshold
+
+    def test_event_driven_examples(self):
+        # Parallel circuits from the examples, gates that become ready on the same cycle are ordered on the DAG
+        def load_example(path):
+            spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], os.path.join(EXAMPLES, path))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return module
+
+        def compile_event_driven(dag, *args, router_kwargs=None, **kwargs):
+            return compile_qcb(dag, *args, router_kwargs=dict(router_kwargs or {}, event_driven=True), **kwargs)
+
+        ghz = load_example('ghz.py')
+        cnot_network = load_example('cnot/cnot_network.py')
+        toffoli = load_example('toffoli/toffoli.py')
+        circuits = (
+            (ghz, lambda: ghz.ghz(8, 10, 10)),
+            (ghz, lambda: ghz.ghz_logn(8, 10, 10)),
+            (cnot_network, lambda: cnot_network.cnot_network(12, 12, 12, n_rounds=3)),
+            (cnot_network, lambda: cnot_network.toff_network(9, 18, 18, T_Factory())),
+            (toffoli, lambda: toffoli.toffoli(14, 21)),
+            (toffoli, lambda: toffoli.toff_network_dag(9, 20, 20)),
+        )
+        for module, circuit in circuits:
+            np.random.seed(0)
+            stepped = circuit()
+            with mock.patch.object(module, 'compile_qcb', compile_event_driven):
+                np.random.seed(0)
+                evented = circuit()
+            assert evented.router.event_driven
+            assert router_signature(stepped.router) == router_signature(evented.router)
+
+    def test_volume_check(self):
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT('a', 'b', 'c', 'd'))
+        dag.add_gate(CNOT('a', 'b'))
+        dag.add_gate(CNOT('c', 'd'))
+        dag.add_gate(T('a'))
+        dag.add_gate(Toffoli('a', 'b', 'c'))
+        dag.add_gate(Hadamard('d'))
+        dag.add_gate(T('c'))
+        dag.add_gate(CNOT('c', 'a'))
+        dag.add_gate(CNOT('b', 'd'))
+
+        # Asserts the running volume against a full scan on every call
+        compile_qcb(dag, 16, 16, T_Factory(), patch_graph_kwargs={'volume_check':True})
+
+    def test_extern_barrier(self):
+        sub_dag = DAG(Symbol('Sub', ('in_a',), ('out_a',)))
+        sub_dag.add_gate(INIT('out_a'))
+        sub_dag.add_gate(CNOT('in_a', 'out_a'))
+        sub_qcb = compile_qcb(sub_dag, 6, 6)
+
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT('a', 'b', 'c'))
+        dag.add_gate(Hadamard('a'))
+        dag.add_gate(CNOT('a', 'b'))
+        dag.add_gate(sub_qcb(('a',), ('c',)))
+        dag.add_gate(CNOT('b', 'c'))
+
+        router = compile_qcb(dag, 16, 16, sub_qcb).router
+        assert len(router.extern_gates) == 1
+        assert len(router.barriers) == 1
+        # Every barrier releases once routing completes
+        assert all(outstanding == 0 for outstanding in router.barriers.values())
+
+    def test_ready_queue(self):
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT('a', 'b', 'c'))
+        for _ in range(3):
+            dag.add_gate(T('a'))
+            dag.add_gate(CNOT('a', 'b'))
+            dag.add_gate(T('b'))
+            dag.add_gate(CNOT('b', 'c'))
+
+        router = compile_qcb(dag, 12, 12, T_Factory()).router
+        assert len(router.ready) == 0
+        assert all(remaining == 0 for remaining in router.ready.n_unresolved.values())
+        # Factories are only queued once, so are never allocated twice on a layer
+        for layer in router.layers:
+            gates = [gate.obj for gate in layer]
+            assert len(gates) == len(set(map(id, gates)))
+
+    def test_fast_routing(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a', 'b', 'c', 'd'))
+            dag.add_gate(CNOT('a', 'b'))
+            dag.add_gate(CNOT('c', 'd'))
+            dag.add_gate(T('a'))
+            dag.add_gate(Toffoli('a', 'b', 'c'))
+            dag.add_gate(CNOT('d', 'a'))
+            dag.add_gate(T('c'))
+            dag.add_gate(CNOT('b', 'd'))
+            return dag
+
+        dag = build_dag()
+        qcb = QCB(16, 16, dag)
+        allocator = Allocator(qcb, T_Factory())
+        graph = QCBGraph(qcb)
+        tree = QCBTree(graph)
+        mapper = QCBMapper(dag, tree)
+
+        # Compares each fast route against the original search on the same graph state
+        class CheckedPatchGraph(PatchGraph):
+            n_routes = 0
+            def route(self, start, end, gate, **kwargs):
+                path = super().route(start, end, gate, **kwargs)
+                fast_path = self.fast_route(start, end, gate, track_rotations=kwargs.get('track_rotations', True), start_orientation=kwargs.get('start_orientation'))
+                if path is PatchGraph.NO_PATH_FOUND:
+                    assert fast_path is PatchGraph.NO_PATH_FOUND
+                else:
+                    assert list(map(id, path)) == list(map(id, fast_path))
+                CheckedPatchGraph.n_routes += 1
+                return path
+
+        circuit_model = CheckedPatchGraph(qcb.shape, mapper, None)
+        rot_injector = RotationInjector(dag, mapper, qcb, graph=circuit_model)
+        router = QCBRouter(qcb, dag, mapper, graph=circuit_model)
+        assert CheckedPatchGraph.n_routes > 0
+
+        compile_qcb(build_dag(), 16, 16, T_Factory(), patch_graph_kwargs={'fast_routing':True})
+
+    def test_route_cache(self):
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT('a'))
+        dag.add_gate(INIT('b'))
+        for _ in range(4):
+            dag.add_gate(CNOT('a', 'b'))
+
+        qcb = QCB(8, 8, dag)
+        allocator = Allocator(qcb)
+        graph = QCBGraph(qcb)
+        tree = QCBTree(graph)
+        mapper = QCBMapper(dag, tree)
+        circuit_model = PatchGraph(qcb.shape, mapper, None, route_cache_size=1)
+        rot_injector = RotationInjector(dag, mapper, qcb, graph=circuit_model)
+        router = QCBRouter(qcb, dag, mapper, graph=circuit_model)
+
+        # Repeated CNOTs between the same registers reuse the cached route
+        hits, misses = circuit_model.route_cache_stats()
+        assert hits > 0
+        assert len(circuit_model.route_cache) == 1
+
+        circuit_model.flush()
+        routes = [patch for row in circuit_model.graph for patch in row if patch.state is SCPatch.ROUTE]
+        start, end = routes[0], routes[-1]
+        gate = RouteBind(dag.gates[-1], None)
+
+        path = circuit_model.route(start, end, gate)
+        assert circuit_model.route_cache_stats() == (hits, misses + 1)
+        assert list(map(id, circuit_model.route(start, end, gate))) == list(map(id, path))
+        assert circuit_model.route_cache_stats() == (hits + 1, misses + 1)
+
+        # Locked patches invalidate the cached route
+        blocking_gate = RouteBind(dag.gates[-2], None)
+        circuit_model.activate(blocking_gate)
+        path[len(path) // 2].lock(blocking_gate)
+        circuit_model.route(start, end, gate)
+        assert circuit_model.route_cache_stats() == (hits + 1, misses + 2)
+        circuit_model.deactivate(blocking_gate)
+
+        # Least recently used routes are evicted
+        circuit_model.route(end, start, gate)
+        assert len(circuit_model.route_cache) == 1
+        circuit_model.route(start, end, gate)
+        assert circuit_model.route_cache_stats() == (hits + 1, misses + 4)
+
+        # A detour found around a lock is not reused once the lock is released
+        start, end = circuit_model[3, 0], circuit_model[3, 7]
+        shortest = circuit_model.route(start, end, gate)
+        circuit_model.activate(blocking_gate)
+        shortest[len(shortest) // 2].lock(blocking_gate)
+        detour = circuit_model.route(start, end, gate)
+        assert len(detour) > len(shortest)
+        circuit_model.deactivate(blocking_gate)
+
+        hits, misses = circuit_model.route_cache_stats()
+        assert len(circuit_model.route(start, end, gate)) == len(shortest)
+        assert circuit_model.route_cache_stats() == (hits, misses + 1)
+        assert len(circuit_model.route(start, end, gate)) == len(shortest)
+        assert circuit_model.route_cache_stats() == (hits + 1, misses + 1)
+
+    def test_negotiated_routing(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            registers = [f'q_{i}' for i in range(12)]
+            for register in registers:
+                dag.add_gate(INIT(register))
+            for i in range(6):
+                dag.add_gate(CNOT(registers[i], registers[-i - 1]))
+                dag.add_gate(CNOT(registers[2 * i], registers[2 * i + 1]))
+            return dag
+
+        dag = build_dag()
+        qcb = QCB(10, 10, dag)
+        allocator = Allocator(qcb)
+        graph = QCBGraph(qcb)
+        tree = QCBTree(graph)
+        mapper = QCBMapper(dag, tree)
+        circuit_model = PatchGraph(qcb.shape, mapper, None)
+        rot_injector = RotationInjector(dag, mapper, qcb, graph=circuit_model)
+        router = QCBRouter(qcb, dag, mapper, graph=circuit_model, negotiated_routing=True)
+
+        # Congestion costs are discarded once each batch has been allocated
+        assert len(router.resolved) == len(dag.gates)
+        assert not circuit_model.congestion
+        assert not circuit_model.route_usage.any()
+        patch = circuit_model[0, 0]
+        assert patch.cost() == 1
+
+        circuit_model.congestion = True
+        circuit_model.congestion_factor = 1
+        circuit_model.occupy([patch])
+        circuit_model.route_history[0, 0] = 1
+        assert patch.cost() == 4
+        circuit_model.clear_congestion()
+        assert patch.cost() == 1
+
+        compiled_qcb = compile_qcb(build_dag(), 10, 10, router_kwargs={'negotiated_routing':True}, patch_graph_kwargs={'fast_routing':True})
+        assert compiled_qcb.n_cycles() > 0
+
+    def test_reservation_routing(self):
+        def build_dag():
+            dag = DAG(Symbol('Test'))
+            dag.add_gate(INIT('a'))
+            dag.add_gate(INIT('b'))
+            for _ in range(3):
+                dag.add_gate(CNOT('a', 'b'))
+            return dag
+
+        dag = build_dag()
+        qcb = QCB(8, 8, dag)
+        allocator = Allocator(qcb)
+        graph = QCBGraph(qcb)
+        tree = QCBTree(graph)
+        mapper = QCBMapper(dag, tree)
+        circuit_model = PatchGraph(qcb.shape, mapper, None)
+        rot_injector = RotationInjector(dag, mapper, qcb, graph=circuit_model)
+        router = QCBRouter(qcb, dag, mapper, graph=circuit_model, reservation_routing=True)
+        assert len(router.resolved) == len(dag.gates)
+
+        circuit_model.flush()
+        circuit_model.current_cycle = 10
+        routes = [patch for row in circuit_model.graph for patch in row if patch.state is SCPatch.ROUTE]
+        start, end = routes[0], routes[-1]
+        gate = RouteBind(dag.gates[-1], None)
+        blocking_gate = RouteBind(dag.gates[-2], None)
+
+        # Free routes start on the current cycle
+        start_cycle, path = circuit_model.reservation_route(start, end, gate)
+        assert start_cycle == 10
+        assert len(path) == len(circuit_model.route(start, end, gate))
+
+        # Every other route is blocked until the blocking gate completes
+        circuit_model.activate(blocking_gate)
+        for patch in routes[1:-1]:
+            patch.lock(blocking_gate)
+            patch.last_used = 15
+        assert circuit_model.route(start, end, gate) is PatchGraph.NO_PATH_FOUND
+        start_cycle, path = circuit_model.reservation_route(start, end, gate)
+        assert start_cycle == 15
+
+        # Reserved patches may only be used by gates that complete before the reservation starts
+        circuit_model.deactivate(blocking_gate)
+        circuit_model.reserve(path, gate, start_cycle)
+        patch = path[1]
+        other_gate = RouteBind(dag.gates[-3], None)
+        assert patch.probe(gate)
+        assert patch.probe(other_gate)
+        circuit_model.current_cycle = 15
+        assert patch.probe(gate)
+        assert not patch.probe(other_gate)
+        assert not circuit_model.free_mask(other_gate)[patch.y, patch.x]
+        circuit_model.release_reservation(gate)
+        assert patch.probe(other_gate)
+
+        compiled_qcb = compile_qcb(build_dag(), 8, 8, router_kwargs={'reservation_routing':True}, patch_graph_kwargs={'fast_routing':True})
+        assert compiled_qcb.n_cycles() > 0
+
+    def test_patch_arrays(self):
+        dag = DAG(Symbol('Test'))
+        dag.add_gate(INIT('a', 'b', 'c', 'd'))
+        dag.add_gate(CNOT('a', 'b'))
+        dag.add_gate(Hadamard('c'))
+        dag.add_gate(CNOT('c', 'd'))
+
+        qcb = QCB(8, 8, dag)
+        allocator = Allocator(qcb)
+        graph = QCBGraph(qcb)
+        tree = QCBTree(graph)
+        mapper = QCBMapper(dag, tree)
+        circuit_model = PatchGraph(qcb.shape, mapper, None)
+        rot_injector = RotationInjector(dag, mapper, qcb, graph=circuit_model)
+        router = QCBRouter(qcb, dag, mapper, graph=circuit_model)
+
+        circuit_model.flush()
+        patch = next(patch for row in circuit_model.graph for patch in row if patch.state is SCPatch.ROUTE)
+        gate = RouteBind(dag.gates[-1], None)
+
+        # Locks are held as integer ids against the active gates
+        assert patch.lock(gate)
+        assert circuit_model.lock_owners[patch.y, patch.x] == circuit_model.lock_id(gate)
+        assert patch.lock_state is gate
+        router.active_gates[gate] = None
+        circuit_model.activate(gate)
+        assert not patch.probe(object())
+        assert patch.probe(gate)
+        assert not patch.probe(gate, unique=True)
+        assert not circuit_model.free_mask(object())[patch.y, patch.x]
+        assert circuit_model.free_mask(gate)[patch.y, patch.x]
+        assert circuit_model.scan_space_time_volume() == circuit_model.static_volume + 1
+
+        circuit_model.flush()
+        assert patch.lock_state is PatchGraphNode.INITIAL_LOCK_STATE
+        assert patch.probe(object())
+
+        orientation = patch.orientation
+        patch.rotate()
+        assert patch.orientation is not orientation
+        assert circuit_model.orientations[patch.y, patch.x] == PatchGraphNode.ORIENTATIONS.index(patch.orientation)
+
+        patch.last_used = 7
+        assert circuit_model.free_at_cycle[patch.y, patch.x] == 7
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+def router_signature(router):
+    layers = [sorted(map(repr, layer)) for layer in router.layers]
+    routes = sorted((repr(gate), tuple((node.y, node.x) for node in route)) for gate, route in router.routes.items())
+    return len(router.layers), router.space_time_volume, layers, routes
+
 if __name__ == '__main__':
     unittest.main()
@@ -60,6 +60,64 @@ class ScopeTest(unittest.TestCase):
         assert(b not in f.io)
         assert(c not in f.io)
 
+    def test_copy_on_write(self):
+        a, b, c, x, y = map(Symbol, 'abcxy')
+
+        parent = Scope({a:x, b:None})
+        child = parent | Scope({c:y})
+        assert(child.layers[0] is parent.layers[0])
+        assert(list(child.keys()) == [a, b, c])
+        assert(child[a] == x and child[c] == y)
+
+        # Writes to either scope are not seen by the other
+        child[b] = y
+        parent[b] = x
+        parent[c] = x
+        assert(child[b] == y)
+        assert(parent[b] == x)
+        assert(child[c] == y)
+        assert(len(child) == 3)
+
+        # Scope semantics hold across layers
+        f = Symbol('F', Symbol('a'), Symbol('b'))
+        assert(Scope(x, y).satisfies(f, child) is True)
+
+        child.inject(Scope({a:Symbol('p'), b:Symbol('q'), c:Symbol('r')}))
+        assert(child.layers == ())
+        assert(Symbol('p') in child and a not in child)
+        assert(parent[a] == x)
+
+        child = parent.extend()
+        child.clear_scope()
+        assert(all(i is None for i in child.values()))
+        assert(parent[a] == x)
+
+    def test_layer_depth(self):
+        scope = Scope()
+        for i in range(3 * Scope.MAX_LAYERS):
+            scope = scope | Scope({Symbol(f'x_{i}'):None})
+            assert(len(scope.layers) <= Scope.MAX_LAYERS + len(scope).bit_length())
+        assert(len(scope) == 3 * Scope.MAX_LAYERS)
+        assert(Symbol('x_0') in scope)
+
+        # Large scopes are shared by in place merges
+        n = 4 * Scope.SHARE_THRESHOLD
+        scope = Scope()
+        for i in range(n):
+            inner = Scope({Symbol(f'y_{j}'):Symbol(f'z_{i}') for j in range(i, i + Scope.SHARE_THRESHOLD)})
+            scope |= inner
+            if i == 0:
+                assert(scope.layers[-1] is inner.layers[-1])
+            assert(len(scope.layers) <= Scope.MAX_LAYERS + scope.n_entries().bit_length())
+        assert(len(scope) == n + Scope.SHARE_THRESHOLD - 1)
+        # Later merges take precedence
+        assert(all(scope[Symbol(f'y_{j}')] == Symbol(f'z_{min(j, n - 1)}') for j in range(n + Scope.SHARE_THRESHOLD - 1)))
+
+        # Writes are applied to the cached flattened mapping
+        scope[Symbol('w')] = None
+        assert(len(scope) == n + Scope.SHARE_THRESHOLD)
+        assert(list(scope.keys())[-1] == Symbol('w'))
+
                 
         
         
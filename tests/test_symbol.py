@@ -1,4 +1,4 @@
-from surface_code_routing.symbol import Symbol, ExternSymbol
+from surface_code_routing.symbol import Symbol, ExternSymbol, symbol_resolve
 from surface_code_routing.scope import Scope
 import unittest
 
@@ -52,6 +52,47 @@ class SymbolTest(unittest.TestCase):
         assert esym.io_element == Symbol('y')
         assert esym.satisfies(matching_symbol)
 
+    def test_intern(self):
+        x = symbol_resolve('x')
+        assert(symbol_resolve('x') is x)
+        assert(symbol_resolve(x) is x)
+
+        # Symbols of io are resolved through the same table
+        sym = Symbol('CNOT', 'x', 'y')
+        assert(sym('x') is x)
+        assert(hash(sym('y')) == hash(Symbol('y')))
+
+        # Explicitly constructed symbols are not shared
+        assert(Symbol('x') is not x)
+        assert(Symbol('x') == x)
+
+        # Objects of different types are not merged
+        assert(symbol_resolve(1) is not symbol_resolve(True))
+
+    def test_intern_shared_between_dags(self):
+        from surface_code_routing.dag import DAG
+        from surface_code_routing.instructions import INIT, CNOT
+
+        dag_a = DAG(Symbol('A'))
+        dag_a.add_gate(INIT('shared', 'a'))
+        dag_a.add_gate(CNOT('shared', 'a'))
+
+        dag_b = DAG(Symbol('B'))
+        dag_b.add_gate(INIT('shared', 'b'))
+        dag_b.add_gate(CNOT('shared', 'b'))
+
+        shared = symbol_resolve('shared')
+        assert(dag_b.scope.keys() & {shared})
+        assert(next(key for key in dag_b.scope.keys() if key == shared) is shared)
+
+        # Lookups of one DAG do not change the symbols the other DAG resolves
+        dag_a.compile(1)
+        lookup = dag_a.lookup()
+        assert(shared in lookup)
+        assert(all(sym.predicate == Symbol('REG') for sym in lookup))
+        assert(shared.predicate is shared)
+        assert(all(key.predicate is key for key in dag_b.scope.keys()))
+
         
 
 if __name__ == '__main__':
@@ -0,0 +1,76 @@
+from surface_code_routing.timeline import Timeline
+import random
+import unittest
+
+class TimelineTest(unittest.TestCase):
+    def test_repeat(self):
+        timeline = Timeline()
+        timeline.append(['a', 'b'])
+        timeline.append(['a'])
+        timeline.repeat(1000)
+
+        assert(len(timeline) == 1002)
+        assert(len(timeline.runs) == 2)
+        assert(list(timeline[-1]) == ['a'])
+        assert(sorted(timeline[0]) == ['a', 'b'])
+
+        # Adding to the final cycle splits it from the repeated run
+        timeline[-1].append('b')
+        assert(len(timeline.runs) == 3)
+        assert(list(timeline[-2]) == ['a'])
+        assert(sorted(timeline[-1]) == ['a', 'b'])
+
+    def test_pop(self):
+        timeline = Timeline()
+        timeline.append(['a'])
+        timeline.append([])
+        timeline.pop()
+        timeline.append(['a'])
+
+        assert(len(timeline) == 2)
+        assert(len(timeline.runs) == 2)
+        assert(list(timeline) == [['a'], ['a']])
+
+    def test_against_lists(self):
+        rng = random.Random(0)
+        gates = ['a', 'b', 'c', 'd']
+        timeline = Timeline()
+        layers = []
+        for _ in range(500):
+            op = rng.random()
+            if op < 0.3 or len(layers) == 0:
+                layer = rng.sample(gates, rng.randint(0, 3))
+                timeline.append(layer)
+                layers.append(list(layer))
+            elif op < 0.5:
+                n_repeats = rng.randint(1, 5)
+                timeline.repeat(n_repeats)
+                for _ in range(n_repeats):
+                    layers.append(list(layers[-1]))
+            elif op < 0.7:
+                gate = rng.choice(gates)
+                cycle = rng.randrange(len(layers))
+                timeline[cycle].append(gate)
+                layers[cycle].append(gate)
+            elif op < 0.8:
+                gate = rng.choice(gates)
+                start = rng.randrange(len(layers))
+                timeline.add_span(gate, start, len(layers))
+                for layer in layers[start:]:
+                    layer.append(gate)
+            elif op < 0.9 and len(layers) > 1:
+                timeline.pop()
+                layers.pop()
+            else:
+                gate = rng.choice(gates)
+                timeline[-1].append(gate)
+                layers[-1].append(gate)
+
+            assert(len(timeline) == len(layers))
+            assert(sorted(timeline[-1]) == sorted(layers[-1]))
+            cycle = rng.randrange(len(layers))
+            assert(sorted(timeline[cycle]) == sorted(layers[cycle]))
+        assert([sorted(layer) for layer in timeline] == [sorted(layer) for layer in layers])
+
+if __name__ == '__main__':
+    unittest.main()